@@ -0,0 +1,528 @@
+'''benchmark.py - per-query latency of the SAT backends in cnf.py
+
+Run from the logic directory (the zchaff backend needs ./zchaff):
+
+    python benchmark.py [--repeat N] [--backends zchaff,libzchaff] [--workers N]
+    python benchmark.py --preprocess [--backends cdcl]
+    python benchmark.py --count [--limit N] [--samples N]
+    python benchmark.py --cubes [--workers N] [--vars 100,150] [--backends zchaff,cdcl]
+    python benchmark.py --suite [--warmup N] [--repeat N] [--json FILE] [--baseline FILE]
+    python benchmark.py --encodings [--backends cdcl,libzchaff]
+    python benchmark.py --game 12:60,60,80 [--turns N] [--encoding E] [--backends cdcl]
+    python benchmark.py --hand-sizes [--budget SECONDS] [--backends libzchaff,cdcl]
+    python benchmark.py --incremental [--backends libzchaff,cdcl]
+'''
+
+import json
+import math
+import optparse
+import os
+import os.path
+import platform
+import time
+
+import cardinality
+import cnf
+import cluedo
+import cluedo_game
+import generators
+import liars
+import preprocess
+
+EXAMPLES = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'zChaff_examples')
+
+def load_dimacs(path):
+    "Read a DIMACS CNF file into a list of clauses"
+    kb, clause = [], []
+    with open(path) as handle:
+        for line in handle:
+            if line[:1] in ('c', 'p', '%'):
+                continue
+            for token in line.split():
+                literal = int(token)
+                if literal == 0:
+                    if clause: kb.append(clause)
+                    clause = []
+                else:
+                    clause.append(literal)
+    if clause:
+        kb.append(clause)
+    return kb
+
+def liars_kb():
+    return liars.rule_caterpillar() + liars.rule_bill() + liars.rule_cheshire() + liars.rule_truth() + liars.rule_salt()
+
+def cluedo_kb():
+    "The knowledge base play_cluedo has right after the deal"
+    return cluedo_game.record(cluedo_game.new_game(), cluedo.deal, "sc", ["wh", "li", "st"])
+
+def workloads():
+    "(name, function) pairs; each function performs one query on the given backend"
+    kbs = [('liars', liars_kb()), ('cluedo', cluedo_kb())]
+    for name in sorted(os.listdir(EXAMPLES)) if os.path.isdir(EXAMPLES) else []:
+        if name.endswith('.cnf'):
+            kbs.append((name[:-4], load_dimacs(os.path.join(EXAMPLES, name))))
+
+    jobs = [('sat/%s' % name, lambda backend, kb=kb: cnf.satisfiable(kb, backend)) for name, kb in kbs]
+    literal = cluedo.Cluedo.getIdentifierFromNames('sc', 'wh')
+    jobs.append(('entails/cluedo', lambda backend, kb=kbs[1][1]: cnf.entails(kb, literal, backend)))
+    return jobs
+
+def time_query(function, backend, repeat):
+    "Mean seconds per call over repeat calls (after one warm-up call)"
+    function(backend)
+    start = time.perf_counter()
+    for _ in range(repeat):
+        function(backend)
+    return (time.perf_counter() - start) / repeat
+
+def query_sweep_time(backend):
+    "Seconds for one cell-by-cell notepad sweep (2 queries per cell) on one session"
+    start = time.perf_counter()
+    with cnf.session(cluedo_kb(), backend) as kb:
+        for player in cluedo.Cluedo.hands:
+            for card in cluedo.Cluedo.cards:
+                cluedo_game.query(kb, player, card)
+    return time.perf_counter() - start
+
+def entails_many_time(backend):
+    "Seconds for one entails_many call over all notepad cells"
+    start = time.perf_counter()
+    with cnf.session(cluedo_kb(), backend) as kb:
+        cnf.entails_many(kb, [cluedo.Cluedo.getIdentifierFromNames(player, card)
+                              for player in cluedo.Cluedo.hands for card in cluedo.Cluedo.cards])
+    return time.perf_counter() - start
+
+def notepad_time(backend, workers=1):
+    "Seconds for one cluedo_game.notepad call (a backbone computation)"
+    start = time.perf_counter()
+    with cnf.ParallelSession(cluedo_kb(), backend, workers) if workers > 1 else cnf.session(cluedo_kb(), backend) as kb:
+        cluedo_game.notepad(kb)
+    return time.perf_counter() - start
+
+def cluedo_replay(sizes=False):
+    """
+    (stage, kb) pairs for the knowledge bases play_cluedo builds turn by
+    turn; with sizes, deal with the hand size axioms as
+    play_cluedo(sizes=True) does, and keep each stage a CNFArray so
+    counting can tell them apart (see cluedo_game.deal_counter)
+    """
+    if sizes:
+        kb = cluedo_game.deal(cluedo_game.new_game(), "sc", ["wh", "li", "st"])
+        copy = cnf.CNFArray
+    else:
+        kb = cluedo_kb()
+        copy = lambda kb: kb[:]
+    stages = [('deal', copy(kb))]
+    for turn, suggestion in enumerate(cluedo_game.SUGGESTIONS, 1):
+        kb.extend(cluedo.suggest(*suggestion))
+        stages.append(('turn %d' % turn, copy(kb)))
+    kb.extend(cluedo.accuse("sc", "pe", "pi", "bi", True))
+    stages.append(('accusation', copy(kb)))
+    return stages
+
+def replay_time(backend, stages, literals, simplify=False):
+    """
+    Seconds spent answering cnf.entails for every notepad literal at
+    every stage.  With simplify each stage is preprocessed once (the
+    notepad variables frozen) and the queries go to the simplified clauses.
+    """
+    start = time.perf_counter()
+    for stage, kb in stages:
+        if simplify:
+            simplified = preprocess.simplify(kb, frozen=literals)
+            # cnf.check_cnf rejects an empty kb; a tautology stands in for it
+            kb = simplified.kb() or [[literals[0], -literals[0]]]
+        for literal in literals:
+            cnf.entails(kb, literal, backend)
+    return time.perf_counter() - start
+
+def integrated_time(backend, stages, literals):
+    "replay_time with cnf.PREPROCESS set, so cnf simplifies each stage itself"
+    previous, cnf.PREPROCESS = cnf.PREPROCESS, True
+    try:
+        return replay_time(backend, stages, literals)
+    finally:
+        cnf.PREPROCESS = previous
+        cnf.SIMPLIFIED.clear()
+
+def consistency_time(backend):
+    "Seconds for one cnf.satisfiable call per stage of the Cluedo replay (all of them satisfiable)"
+    stages = cluedo_replay()
+    start = time.perf_counter()
+    for stage, kb in stages:
+        cnf.satisfiable(kb, backend)
+    return time.perf_counter() - start
+
+def preprocess_report(backends):
+    "Print what each preprocessing step removes, then time the replay with and without it"
+    stages = cluedo_replay()
+    for stage, kb in [stages[0], stages[len(stages) // 2], stages[-1]]:
+        print('Cluedo replay, %s (%d clauses):' % (stage, len(kb)))
+        print(preprocess.simplify(kb).report())
+        print('')
+    literals = [cluedo.Cluedo.getIdentifierFromNames(player, card)
+                for player in cluedo.Cluedo.hands for card in cluedo.Cluedo.cards]
+    print('%-20s' % ('entails x %d' % (len(stages) * len(literals))) + ''.join('%14s' % backend for backend in backends))
+    rows = {}
+    for simplify in (False, True):
+        rows[simplify] = [replay_time(backend, stages, literals, simplify) for backend in backends]
+    print('%-20s' % 'plain' + ''.join('%11.3f s ' % seconds for seconds in rows[False]))
+    print('%-20s' % 'preprocessed' + ''.join('%11.3f s ' % seconds for seconds in rows[True]))
+    print('%-20s' % 'saved' + ''.join('%11.3f s ' % (plain - simplified) for plain, simplified in zip(rows[False], rows[True])))
+    integrated = [integrated_time(backend, stages, literals) for backend in backends]
+    print('%-20s' % 'cnf.PREPROCESS' + ''.join('%11.3f s ' % seconds for seconds in integrated))
+
+def count_report(limit, samples=50):
+    """
+    Time exact model counting (cluedo_game.count_deals) and the
+    probability grid at several turns of the Cluedo replay, next to
+    estimating the grid from samples models and to enumerating models one
+    by one (stopped after limit models); without and with the hand sizes
+    """
+    print('%-12s %16s %10s %10s %10s %8s %18s' % ('stage', 'models', 'count', 'grid', 'estimate', 'error', 'enumerate'))
+    stages = cluedo_replay()
+    sized = cluedo_replay(sizes=True)
+    for stage, kb in stages[::5] + [stages[-1]] + [(stage + '+sizes', kb) for stage, kb in sized[::5] + [sized[-1]]]:
+        start = time.perf_counter()
+        models = cluedo_game.count_deals(kb)
+        counted = time.perf_counter() - start
+        start = time.perf_counter()
+        exact = cluedo_game.probabilities(kb)
+        grid = time.perf_counter() - start
+        start = time.perf_counter()
+        estimate = cluedo_game.estimates(kb, samples, seed=1)
+        estimated = time.perf_counter() - start
+        error = max(abs(estimate[cell][0] - exact[cell]) for cell in exact)
+        start = time.perf_counter()
+        found = sum(1 for model in cnf.iter_models(kb, limit=limit))
+        enumerated = time.perf_counter() - start
+        print('%-12s %16d %8.1fms %8.1fms %8.1fms %8.3f %9.1fms %s%d' % (
+            stage, models, 1000 * counted, 1000 * grid, 1000 * estimated, error,
+            1000 * enumerated, '>=' if found == limit else '', found))
+
+def cube_report(backends, workers, variables, instances=3):
+    """
+    Time cube-and-conquer on workers workers next to each backend solving
+    alone, on random 3-SAT at the phase transition (4.26 clauses per
+    variable) and on entailment queries in scaled-up Cluedo games
+    """
+    jobs = []
+    for n in variables:
+        for seed in range(instances):
+            jobs.append(('3-SAT n=%d #%d' % (n, seed), generators.random_ksat(n, 4.26, 3, seed)))
+    for players, size in [(12, 20), (24, 40)]:
+        kb = generators.scaled_cluedo(players, (size, size, size), 4 * players, seed=1)
+        # is the first card in the case file?
+        jobs.append(('cluedo %dx%d' % (players, 3 * size), kb + [[-(players * 3 * size + 1)]]))
+    columns = backends + ['cubes x%d' % workers]
+    print('%-20s' % 'instance' + ''.join('%16s' % column for column in columns))
+    for name, kb in jobs:
+        row = []
+        for backend in columns:
+            start = time.perf_counter()
+            if backend in backends:
+                answer = cnf.satisfiable(kb, backend)
+            else:
+                answer = cnf.cube_and_conquer_call(kb, False, workers)[0]
+            row.append('%11.3f s %s' % (time.perf_counter() - start, 'S' if answer else 'U'))
+        print('%-20s' % name + ''.join('%16s' % cell for cell in row))
+
+def encoding_report(backends, sizes=(6, 12, 24, 48, 96), players=6):
+    """
+    Clauses, variables and solve time of the Cluedo axioms in each
+    cardinality encoding as the deck grows: every category has size
+    cards.  The time is one satisfiable and one entails call (is the first
+    card in the case file?) after 4 * players random suggestions.
+    """
+    print('%-8s %-11s %9s %9s' % ('deck', 'encoding', 'clauses', 'variables') +
+          ''.join('%14s' % backend for backend in backends))
+    for size in sizes:
+        for encoding in cardinality.ENCODINGS:
+            kb = generators.scaled_cluedo(players, (size, size, size), 4 * players, seed=1, encoding=encoding)
+            variables = max(abs(literal) for clause in kb for literal in clause)
+            row = []
+            for backend in backends:
+                start = time.perf_counter()
+                cnf.satisfiable(kb, backend)
+                cnf.entails(kb, players * 3 * size + 1, backend)
+                row.append('%11.3f ms' % (1000 * (time.perf_counter() - start)))
+            print('%-8s %-11s %9d %9d' % ('3x%d' % size, encoding, len(kb), variables) + ''.join('%14s' % cell for cell in row))
+
+def game_report(backends, spec, turns, encoding='pairwise'):
+    "Seconds for one notepad of a random game of shape spec (a cluedo.GameSpec) on each backend"
+    kb = generators.random_game(spec, turns, seed=1, encoding=encoding)
+    variables = max(abs(literal) for clause in kb for literal in clause)
+    print('%r, %d turns: %d clauses, %d variables' % (spec, turns, len(kb), variables))
+    for backend in backends:
+        start = time.perf_counter()
+        with cnf.session(kb, backend) as session:
+            grid = cluedo_game.notepad(session, spec=spec)
+        print('%-12s %9.3f s  %d of %d cells known' % (backend, time.perf_counter() - start,
+                                                       sum(answer != '-' for answer in grid.values()), len(grid)))
+
+def hand_size_report(backends, budget):
+    """
+    Seconds for one notepad (what printNotepad shows) with and without the
+    hand size axioms, on the play_cluedo game after the deal and after
+    every suggestion and on random scaled-up games; times over budget are
+    marked with !
+    """
+    deal = cluedo_game.record(cluedo_game.new_game(), cluedo.deal, "sc", ["wh", "li", "st"])
+    sized = cluedo_game.deal(cluedo_game.new_game(), "sc", ["wh", "li", "st"])
+    games = [('cluedo/deal', cluedo.CLASSIC, list(deal), list(sized))]
+    for suggestion in cluedo_game.SUGGESTIONS:
+        deal.extend(cluedo.suggest(*suggestion))
+        sized.extend(cluedo.suggest(*suggestion))
+    games.append(('cluedo/suggested', cluedo.CLASSIC, list(deal), list(sized)))
+    for players, size in [(6, 10), (12, 20)]:
+        spec = cluedo.GameSpec.generic(players, (size, size, size))
+        games.append(('cluedo %dx%d' % (players, 3 * size), spec,
+                      generators.random_game(spec, 4 * players, seed=1),
+                      generators.random_game(spec, 4 * players, seed=1, sizes=True)))
+    print('%-18s %-10s %10s %10s %12s' % ('game', 'backend', 'plain', 'sizes', 'cells known'))
+    for name, spec, plain, sized in games:
+        for backend in backends:
+            row, known = [], []
+            for kb in (plain, sized):
+                start = time.perf_counter()
+                with cnf.session(kb, backend) as session:
+                    grid = cluedo_game.notepad(session, spec=spec)
+                elapsed = time.perf_counter() - start
+                row.append('%8.3f s%s' % (elapsed, '!' if elapsed > budget else ' '))
+                known.append(sum(answer != '-' for answer in grid.values()))
+            print('%-18s %-10s %10s %10s %5d ->%4d' % ((name, backend) + tuple(row) + tuple(known)))
+
+def incremental_report(backends):
+    """
+    Solver calls and seconds for keeping the notepad up to date turn by
+    turn: a full notepad after every turn next to one Notepad refreshed
+    after every turn, on the play_cluedo game and on random scaled-up games
+    """
+    kb = cluedo_game.deal(cluedo_game.new_game(), "sc", ["wh", "li", "st"])
+    stages = [list(kb)]
+    for suggestion in cluedo_game.SUGGESTIONS:
+        kb.extend(cluedo.suggest(*suggestion))
+        stages.append(list(kb))
+    games = [('cluedo', cluedo.CLASSIC, stages)]
+    for players, size in [(6, 10), (12, 20)]:
+        spec = cluedo.GameSpec.generic(players, (size, size, size))
+        # random_game with one more turn adds that turn's clauses at the end
+        stages = [generators.random_game(spec, turn, seed=1, sizes=True) for turn in range(4 * players + 1)]
+        games.append(('cluedo %dx%d' % (players, 3 * size), spec, stages))
+
+    calls = [0]
+    def count(stats):
+        calls[0] += 1
+    cnf.add_hook(count)
+    print('%-14s %-10s %6s %14s %14s %16s' % ('game', 'backend', 'turns', 'full', 'incremental', 'calls per turn'))
+    try:
+        for name, spec, stages in games:
+            for backend in backends:
+                calls[0], start = 0, time.perf_counter()
+                for stage in stages:
+                    with cnf.session(stage, backend) as session:
+                        cluedo_game.notepad(session, spec=spec)
+                full, full_calls = time.perf_counter() - start, calls[0]
+                calls[0], start = 0, time.perf_counter()
+                kb = cnf.CNFArray()
+                with cluedo_game.Notepad(kb, backend=backend, spec=spec) as pad:
+                    for stage in stages:
+                        kb.extend(stage[len(kb):])
+                        pad.refresh()
+                incremental = time.perf_counter() - start
+                print('%-14s %-10s %6d %7.3f s %5d %7.3f s %5d %8.1f -> %4.1f' % (
+                    name, backend, len(stages) - 1, full, full_calls, incremental, calls[0],
+                    full_calls / len(stages), calls[0] / len(stages)))
+    finally:
+        cnf.remove_hook(count)
+
+def suite_cases():
+    """
+    (name, kb, literal) for every instance of the benchmark suite, from
+    the generators and the Cluedo and liars knowledge bases; cnf.entails
+    is timed for literal, cnf.satisfiable when literal is None
+    """
+    cases = [('liars', liars_kb(), None), ('cluedo', cluedo_kb(), None),
+             ('cluedo/entails', cluedo_kb(), cluedo.Cluedo.getIdentifierFromNames('sc', 'wh'))]
+    for ratio in (3.0, 4.26, 6.0):
+        for n in (50, 100):
+            cases.append(('3-SAT n=%d r=%.2f' % (n, ratio), generators.random_ksat(n, ratio, 3, seed=n), None))
+    for holes in (5, 6):
+        cases.append(('pigeonhole %d' % holes, generators.pigeonhole(holes), None))
+    for players, size in [(6, 10), (12, 20)]:
+        kb = generators.scaled_cluedo(players, (size, size, size), 4 * players, seed=1)
+        cases.append(('cluedo %dx%d' % (players, 3 * size), kb, None))
+        cases.append(('cluedo %dx%d/entails' % (players, 3 * size), kb, players * 3 * size + 1))
+    for suspects in (10, 40):
+        cases.append(('liars %d' % suspects, generators.liars_puzzle(suspects, seed=suspects), None))
+    return cases
+
+def percentile(samples, fraction):
+    "The nearest-rank percentile of samples, for fraction between 0 and 1"
+    ordered = sorted(samples)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+def run_suite(backends, cases, warmup=1, repeat=10):
+    """
+    Time every case on every backend: warmup untimed calls, then repeat
+    timed ones.  Returns one dict per case and backend with the seconds
+    of every timed call, their percentiles, and the mean seconds per call
+    that the backend's SolverStats put in each phase (serialize, spawn,
+    solve, parse).
+    """
+    phases = ('serialize', 'spawn', 'solve', 'parse')
+    results = []
+    for name, kb, literal in cases:
+        for backend in backends:
+            if literal is None:
+                query = lambda: cnf.satisfiable(kb, backend)
+            else:
+                query = lambda: cnf.entails(kb, literal, backend)
+            for _ in range(warmup):
+                query()
+            breakdown = dict.fromkeys(phases, 0.0)
+
+            def collect(stats):
+                if stats.backend == backend:
+                    for phase in phases:
+                        breakdown[phase] += getattr(stats, phase)
+            cnf.add_hook(collect)
+            samples = []
+            try:
+                for _ in range(repeat):
+                    start = time.perf_counter()
+                    answer = query()
+                    samples.append(time.perf_counter() - start)
+            finally:
+                cnf.remove_hook(collect)
+            results.append({
+                'case': name, 'backend': backend,
+                'query': 'satisfiable' if literal is None else 'entails',
+                'variables': max(abs(other) for clause in kb for other in clause),
+                'clauses': len(kb), 'answer': answer, 'samples': samples,
+                'min': min(samples), 'mean': sum(samples) / len(samples),
+                'p50': percentile(samples, 0.5), 'p90': percentile(samples, 0.9),
+                'p99': percentile(samples, 0.99), 'max': max(samples),
+                'phases': dict((phase, breakdown[phase] / repeat) for phase in phases),
+            })
+    return results
+
+def print_suite(results, baseline=None):
+    """
+    One line per case and backend, in milliseconds.  With baseline
+    (results loaded from an earlier --json run) the p50 is compared with
+    the baseline's, and rows more than 25% slower are marked.
+    """
+    before = dict(((row['case'], row['backend']), row) for row in baseline or [])
+    print('%-24s %-10s %6s %10s %10s %10s %10s %10s%s' % (
+        'case', 'backend', 'answer', 'p50', 'p90', 'p99', 'serialize', 'solve', '   vs baseline' if baseline else ''))
+    for row in results:
+        change = ''
+        old = before.get((row['case'], row['backend']))
+        if old is not None:
+            ratio = row['p50'] / old['p50'] if old['p50'] else float('inf')
+            change = '   %6.2fx%s' % (ratio, ' slower' if ratio > 1.25 else '')
+        print('%-24s %-10s %6s %8.3fms %8.3fms %8.3fms %8.3fms %8.3fms%s' % (
+            row['case'], row['backend'], row['answer'],
+            1000 * row['p50'], 1000 * row['p90'], 1000 * row['p99'],
+            1000 * row['phases']['serialize'], 1000 * row['phases']['solve'], change))
+
+def write_json(path, results, warmup, repeat):
+    "Save results, with the machine and settings they were measured on, as JSON"
+    document = {
+        'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'python': platform.python_version(), 'platform': platform.platform(),
+        'cpus': os.cpu_count(), 'warmup': warmup, 'repeat': repeat,
+        'results': results,
+    }
+    with open(path, 'w') as out:
+        json.dump(document, out, indent=1)
+
+def run(backends, repeat, workers=1):
+    print('%-20s' % 'query' + ''.join('%14s' % backend for backend in backends))
+    for name, function in workloads():
+        row = ['%11.3f ms' % (1000 * time_query(function, backend, repeat)) for backend in backends]
+        print('%-20s' % name + ''.join('%14s' % cell for cell in row))
+    for name, function in [('query sweep', query_sweep_time), ('entails_many', entails_many_time), ('notepad', notepad_time),
+                           ('consistency', consistency_time)]:
+        row = ['%11.3f ms' % (1000 * function(backend)) for backend in backends]
+        print('%-20s' % name + ''.join('%14s' % cell for cell in row))
+    if workers > 1:
+        row = ['%11.3f ms' % (1000 * notepad_time(backend, workers)) for backend in backends]
+        print('%-20s' % ('notepad x%d' % workers) + ''.join('%14s' % cell for cell in row))
+    if cnf.WINS:
+        print('')
+        print('portfolio winners by instance class:')
+        cnf.dump_wins()
+
+if __name__ == '__main__':
+    parser = optparse.OptionParser(description='Time cnf.satisfiable/entails per backend')
+    parser.add_option('--repeat', dest='repeat', type='int', default=50,
+                      help='timed calls per query (default %default)')
+    parser.add_option('--backends', dest='backends', default=','.join(sorted(cnf.BACKENDS)),
+                      help='comma separated backends to compare (default %default)')
+    parser.add_option('--workers', dest='workers', type='int', default=cnf.count_workers(0),
+                      help='workers for the parallel notepad row (default %default, one per core)')
+    parser.add_option('--preprocess', dest='preprocess', action='store_true', default=False,
+                      help='report preprocessing reductions and time saved on the Cluedo replay')
+    parser.add_option('--count', dest='count', action='store_true', default=False,
+                      help='time model counting against enumeration on the Cluedo replay')
+    parser.add_option('--limit', dest='limit', type='int', default=2000,
+                      help='models to enumerate before giving up with --count (default %default)')
+    parser.add_option('--samples', dest='samples', type='int', default=50,
+                      help='sampled models per probability estimate with --count (default %default)')
+    parser.add_option('--cubes', dest='cubes', action='store_true', default=False,
+                      help='time cube-and-conquer on --workers workers against single solvers')
+    parser.add_option('--vars', dest='vars', default='100,150,200',
+                      help='random 3-SAT sizes for --cubes (default %default)')
+    parser.add_option('--suite', dest='suite', action='store_true', default=False,
+                      help='time the generated benchmark suite with percentiles per backend')
+    parser.add_option('--warmup', dest='warmup', type='int', default=1,
+                      help='untimed calls per case with --suite (default %default)')
+    parser.add_option('--json', dest='json',
+                      help='also write the --suite results to this JSON file')
+    parser.add_option('--baseline', dest='baseline',
+                      help='compare the --suite results with a JSON file from an earlier run')
+    parser.add_option('--encodings', dest='encodings', action='store_true', default=False,
+                      help='compare the cardinality encodings of the Cluedo axioms as the deck grows')
+    parser.add_option('--game', dest='game',
+                      help='time the notepad of a random game of PLAYERS:SIZE,SIZE,... (players and category sizes)')
+    parser.add_option('--turns', dest='turns', type='int', default=60,
+                      help='suggestions made in the --game game')
+    parser.add_option('--encoding', dest='encoding', default='pairwise', choices=cardinality.ENCODINGS,
+                      help='cardinality encoding of the --game axioms')
+    parser.add_option('--hand-sizes', dest='hand_sizes', action='store_true', default=False,
+                      help='notepad latency with and without the hand size axioms')
+    parser.add_option('--budget', dest='budget', type='float', default=1.0,
+                      help='notepad latency budget in seconds for --hand-sizes')
+    parser.add_option('--incremental', dest='incremental', action='store_true', default=False,
+                      help='full notepads after every turn against an incrementally refreshed Notepad')
+    options, args = parser.parse_args()
+    if options.incremental:
+        incremental_report(options.backends.split(','))
+    elif options.hand_sizes:
+        hand_size_report(options.backends.split(','), options.budget)
+    elif options.game:
+        players, sizes = options.game.split(':')
+        spec = cluedo.GameSpec.generic(int(players), [int(size) for size in sizes.split(',')])
+        game_report(options.backends.split(','), spec, options.turns, options.encoding)
+    elif options.encodings:
+        encoding_report(options.backends.split(','))
+    elif options.suite:
+        results = run_suite(options.backends.split(','), suite_cases(), options.warmup, options.repeat)
+        baseline = None
+        if options.baseline:
+            with open(options.baseline) as handle:
+                baseline = json.load(handle)['results']
+        print_suite(results, baseline)
+        if options.json:
+            write_json(options.json, results, options.warmup, options.repeat)
+    elif options.cubes:
+        cube_report(options.backends.split(','), options.workers, [int(n) for n in options.vars.split(',')])
+    elif options.count:
+        count_report(options.limit, options.samples)
+    elif options.preprocess:
+        preprocess_report(options.backends.split(','))
+    else:
+        run(options.backends.split(','), options.repeat, options.workers)
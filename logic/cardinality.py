@@ -0,0 +1,191 @@
+'''cardinality.py - CNF for "at most / at least / exactly k of these
+literals are true".
+
+at_most can build any of these encodings (n literals, bound k):
+
+  pairwise     no new variables: a clause for every k + 1 of the
+               literals, so n(n-1)/2 clauses for k = 1 and C(n, k+1) in
+               general
+  sequential   Sinz's sequential counter: (n-1)k auxiliary variables
+               counting the true literals so far, about 2nk clauses
+  commander    Klieber and Kwon: the literals in groups of k + 2, each
+               group with k commander variables that count its true
+               literals, then the same constraint on the commanders
+  product      Chen's product encoding, only for k = 1: the literals on a
+               p x q grid, each forcing its row and its column variable,
+               and at most one row and one column; about 2n + 4 sqrt(n)
+               clauses
+  totalizer    Bailleux and Boufkhad: a binary tree of unary counters,
+               each capped at k + 1
+
+at_least(k) is at_most(n - k) of the negated literals, except that at
+least one is just the clause of the literals.  between (and exactly, its
+special case) is both; the totalizer builds one tree with clauses in both
+directions for it.
+
+Auxiliary variables come from a Pool, which hands out variables above
+every one in use.  All the constraints of one knowledge base must draw
+from the same pool.
+'''
+
+import itertools
+import math
+
+ENCODINGS = ('pairwise', 'sequential', 'commander', 'product', 'totalizer')
+
+class Pool:
+    "Fresh variables, numbered upwards from top + 1"
+
+    def __init__(self, top=0):
+        self.top = top
+
+    def fresh(self, count=1):
+        "A list of count variables that have not been handed out before"
+        first = self.top + 1
+        self.top += count
+        return list(range(first, self.top + 1))
+
+def at_most(literals, k, encoding='pairwise', pool=None):
+    "Clauses that allow at most k of literals to be true"
+    literals = list(literals)
+    if encoding not in ENCODINGS:
+        raise ValueError('unknown cardinality encoding %r' % encoding)
+    if k < 0:
+        raise ValueError('at most %d literals can never hold' % k)
+    if k >= len(literals):
+        return []
+    if k == 0:
+        return [[-literal] for literal in literals]
+    if encoding == 'pairwise' or len(literals) == k + 1:
+        return pairwise(literals, k)
+    if pool is None:
+        raise ValueError('the %s encoding needs a Pool for its auxiliary variables' % encoding)
+    if encoding == 'sequential':
+        return sequential(literals, k, pool)
+    if encoding == 'commander':
+        return commander(literals, k, pool)
+    if encoding == 'product':
+        return product(literals, k, pool)
+    clauses = []
+    counts = totalizer(literals, k + 1, pool, clauses, True, False)
+    clauses.append([-counts[k]])
+    return clauses
+
+def at_least(literals, k, encoding='pairwise', pool=None):
+    "Clauses that make at least k of literals true"
+    literals = list(literals)
+    if k > len(literals):
+        raise ValueError('at least %d of %d literals can never hold' % (k, len(literals)))
+    if k <= 0:
+        return []
+    if k == 1:
+        return [literals]
+    if encoding == 'totalizer' and pool is not None:
+        clauses = []
+        counts = totalizer(literals, k, pool, clauses, False, True)
+        clauses.append([counts[k - 1]])
+        return clauses
+    return at_most([-literal for literal in literals], len(literals) - k, encoding, pool)
+
+def exactly(literals, k, encoding='pairwise', pool=None):
+    "Clauses that make exactly k of literals true"
+    return between(literals, k, k, encoding, pool)
+
+def between(literals, low, high, encoding='pairwise', pool=None):
+    "Clauses that make at least low and at most high of literals true"
+    literals = list(literals)
+    if low > high:
+        raise ValueError('at least %d and at most %d literals can never hold' % (low, high))
+    if encoding == 'totalizer' and pool is not None and 1 < low and high < len(literals) - 1:
+        clauses = []
+        counts = totalizer(literals, high + 1, pool, clauses, True, True)
+        clauses.append([counts[low - 1]])
+        clauses.append([-counts[high]])
+        return clauses
+    return at_least(literals, low, encoding, pool) + at_most(literals, high, encoding, pool)
+
+def pairwise(literals, k):
+    return [[-literal for literal in chosen] for chosen in itertools.combinations(literals, k + 1)]
+
+def sequential(literals, k, pool):
+    # counter[i][j] is implied when at least j + 1 of literals[:i + 1] are true
+    n = len(literals)
+    counter = [pool.fresh(k) for i in range(n - 1)]
+    clauses = [[-literals[0], counter[0][0]]]
+    clauses.extend([-counter[0][j]] for j in range(1, k))
+    for i in range(1, n - 1):
+        clauses.append([-literals[i], counter[i][0]])
+        clauses.append([-counter[i - 1][0], counter[i][0]])
+        for j in range(1, k):
+            clauses.append([-literals[i], -counter[i - 1][j - 1], counter[i][j]])
+            clauses.append([-counter[i - 1][j], counter[i][j]])
+        clauses.append([-literals[i], -counter[i - 1][k - 1]])
+    clauses.append([-literals[n - 1], -counter[n - 2][k - 1]])
+    return clauses
+
+def commander(literals, k, pool):
+    size = k + 2
+    if len(literals) <= size:
+        return pairwise(literals, k)
+    clauses, commanders = [], []
+    for start in range(0, len(literals), size):
+        group = literals[start:start + size]
+        if len(group) <= k:
+            # too few to break the bound: they stand for themselves
+            commanders.extend(group)
+            continue
+        chosen = pool.fresh(k)
+        # exactly k of the group and the negated commanders, so as many
+        # commanders are true as literals of the group
+        extended = group + [-var for var in chosen]
+        clauses.extend(pairwise(extended, k))
+        clauses.extend(list(picked) for picked in itertools.combinations(extended, len(extended) - k + 1))
+        clauses.extend([-chosen[j + 1], chosen[j]] for j in range(k - 1))
+        commanders.extend(chosen)
+    return clauses + commander(commanders, k, pool)
+
+def product(literals, k, pool):
+    if k != 1:
+        raise ValueError('the product encoding only handles at most one')
+    if len(literals) <= 4:
+        return pairwise(literals, 1)
+    rows = math.ceil(math.sqrt(len(literals)))
+    columns = math.ceil(len(literals) / rows)
+    row, column = pool.fresh(rows), pool.fresh(columns)
+    clauses = []
+    for index, literal in enumerate(literals):
+        r, c = divmod(index, columns)
+        clauses.append([-literal, row[r]])
+        clauses.append([-literal, column[c]])
+    return clauses + product(row, 1, pool) + product(column, 1, pool)
+
+def totalizer(literals, cap, pool, clauses, up, down):
+    """
+    The outputs of a totalizer over literals, appending its clauses to
+    clauses: output i is implied by i + 1 true literals (up) and implies
+    them (down), for up to cap outputs
+    """
+    if len(literals) == 1:
+        return literals[:]
+    half = len(literals) // 2
+    left = totalizer(literals[:half], cap, pool, clauses, up, down)
+    right = totalizer(literals[half:], cap, pool, clauses, up, down)
+    outputs = pool.fresh(min(len(left) + len(right), cap))
+    for i in range(len(left) + 1):
+        for j in range(len(right) + 1):
+            total = i + j
+            if up and 0 < total <= len(outputs):
+                clause = [outputs[total - 1]]
+                if i > 0:
+                    clause.append(-left[i - 1])
+                if j > 0:
+                    clause.append(-right[j - 1])
+                clauses.append(clause)
+            if down and total < len(outputs):
+                clause = [-outputs[total]]
+                if i < len(left):
+                    clause.append(left[i])
+                if j < len(right):
+                    clause.append(right[j])
+                clauses.append(clause)
+    return outputs
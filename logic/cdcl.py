@@ -0,0 +1,342 @@
+'''cdcl.py - a conflict driven clause learning SAT solver in pure Python.
+
+It needs neither the zchaff executable nor libsat.so, and for the small
+knowledge bases of this project it answers before a zchaff process has
+even started.  The usual ingredients are all here:
+
+  - two watched literals per clause for unit propagation
+  - VSIDS variable activities with phase saving for decisions
+  - first-UIP conflict analysis and clause learning
+  - restarts following the Luby sequence
+
+Clauses live in one flat array('i') of literals plus per-clause start and
+size arrays.  Internally variable v is the literal code 2*v and -v is
+2*v + 1, the same encoding the zchaff C API uses.
+
+Solver is incremental: clauses can be added between calls to solve, and
+solve takes assumption literals, so learned clauses stay valid from one
+query to the next.  When solve fails under assumptions, self.conflict
+lists the assumptions that the refutation actually used (MiniSat's
+analyzeFinal), which is what cnf.explain builds unsatisfiable cores from.
+A search can be interrupted from another thread through self.stopped.
+'''
+
+from array import array
+import heapq
+
+TRUE, FALSE, FREE = 1, -1, 0
+
+def luby(i):
+    "The i-th (1-based) element of the Luby sequence 1 1 2 1 1 2 4 1 ..."
+    size, seq = 1, 0
+    while size < i + 1:
+        seq += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        seq -= 1
+        i = i % size
+    return 1 << seq
+
+class Solver:
+
+    restart_base = 100
+    var_decay = 0.95
+
+    def __init__(self, kb=()):
+        self.nvars = 0
+        self.lits = array('i')       # every clause's literal codes, back to back
+        self.start = array('i')      # clause index -> offset into lits
+        self.size = array('i')       # clause index -> number of literals
+        self.watches = [[], []]      # literal code -> clauses watching it
+        self.value = array('b', [FREE, FREE])   # literal code -> TRUE/FALSE/FREE
+        self.level = array('i', [0])
+        self.reason = array('i', [-1])
+        self.phase = array('b', [FALSE])
+        self.activity = [0.0]
+        self.heap = []
+        self.trail = []
+        self.trail_lim = []
+        self.qhead = 0
+        self.increment = 1.0
+        self.ok = True
+        self.conflict = []           # assumptions used by the last failed solve
+        self.stopped = None          # if set, called after every conflict; true ends the search
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        self.learned = 0
+        self.restarts = 0
+        for clause in kb:
+            self.add_clause(clause)
+
+    def new_vars(self, nvars):
+        "Make sure variables 1..nvars exist"
+        while self.nvars < nvars:
+            self.nvars += 1
+            self.watches.extend(([], []))
+            self.value.extend((FREE, FREE))
+            self.level.append(0)
+            self.reason.append(-1)
+            self.phase.append(FALSE)
+            self.activity.append(0.0)
+            heapq.heappush(self.heap, (0.0, self.nvars))
+
+    def add_clause(self, clause):
+        """
+        Add a DIMACS clause permanently.  Returns False once the clauses
+        added so far are known to be unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        self.new_vars(max([abs(literal) for literal in clause] or [0]))
+        codes = []
+        for literal in set(clause):
+            code = 2 * literal if literal > 0 else -2 * literal + 1
+            if self.value[code] == TRUE or code ^ 1 in codes:
+                return True
+            if self.value[code] == FREE:
+                codes.append(code)
+        if not codes:
+            self.ok = False
+        elif len(codes) == 1:
+            self.enqueue(codes[0], -1)
+            self.ok = self.propagate() < 0
+        else:
+            self.attach(codes)
+        return self.ok
+
+    def attach(self, codes):
+        "Store a clause and watch its first two literals; returns its index"
+        index = len(self.start)
+        self.start.append(len(self.lits))
+        self.size.append(len(codes))
+        self.lits.extend(codes)
+        self.watches[codes[0]].append(index)
+        self.watches[codes[1]].append(index)
+        return index
+
+    def enqueue(self, code, reason):
+        var = code >> 1
+        self.value[code] = TRUE
+        self.value[code ^ 1] = FALSE
+        self.level[var] = len(self.trail_lim)
+        self.reason[var] = reason
+        self.trail.append(code)
+
+    def propagate(self):
+        "Unit propagation over the trail; returns a conflicting clause or -1"
+        lits, start, size, value, watches = self.lits, self.start, self.size, self.value, self.watches
+        trail = self.trail
+        while self.qhead < len(trail):
+            false_lit = trail[self.qhead] ^ 1
+            self.qhead += 1
+            self.propagations += 1
+            watching = watches[false_lit]
+            kept = []
+            for position, clause in enumerate(watching):
+                s = start[clause]
+                if lits[s] == false_lit:
+                    lits[s] = lits[s + 1]
+                    lits[s + 1] = false_lit
+                first = lits[s]
+                if value[first] == TRUE:
+                    kept.append(clause)
+                    continue
+                for k in range(s + 2, s + size[clause]):
+                    other = lits[k]
+                    if value[other] != FALSE:
+                        lits[s + 1] = other
+                        lits[k] = false_lit
+                        watches[other].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if value[first] == FALSE:
+                        kept.extend(watching[position + 1:])
+                        watches[false_lit] = kept
+                        return clause
+                    self.enqueue(first, clause)
+            watches[false_lit] = kept
+        return -1
+
+    def bump(self, var):
+        self.activity[var] += self.increment
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.increment *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, self.nvars + 1) if self.value[2 * v] == FREE]
+            heapq.heapify(self.heap)
+        elif self.value[2 * var] == FREE:
+            heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def analyze(self, conflict):
+        "First-UIP learning; returns (learned clause codes, backjump level)"
+        lits, start, size, level, reason = self.lits, self.start, self.size, self.level, self.reason
+        seen = set()
+        learned = [0]
+        current = len(self.trail_lim)
+        pending = 0
+        code = -1
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            s = start[clause]
+            for k in range(s if code < 0 else s + 1, s + size[clause]):
+                other = lits[k]
+                var = other >> 1
+                if var not in seen and level[var] > 0:
+                    seen.add(var)
+                    self.bump(var)
+                    if level[var] == current:
+                        pending += 1
+                    else:
+                        learned.append(other)
+            while (self.trail[index] >> 1) not in seen:
+                index -= 1
+            code = self.trail[index]
+            index -= 1
+            clause = reason[code >> 1]
+            seen.discard(code >> 1)
+            pending -= 1
+            if pending == 0:
+                break
+        learned[0] = code ^ 1
+        self.increment /= self.var_decay
+
+        if len(learned) == 1:
+            return learned, 0
+        deepest = max(range(1, len(learned)), key=lambda k: level[learned[k] >> 1])
+        learned[1], learned[deepest] = learned[deepest], learned[1]
+        return learned, level[learned[1] >> 1]
+
+    def analyze_final(self, code):
+        """
+        The assumptions (DIMACS literals) that force the literal code false
+        on the current trail; every decision level so far is an assumption
+        """
+        conflict = [code]
+        if not self.trail_lim:
+            return [self.decode(code)]
+        lits, start, size, level, reason = self.lits, self.start, self.size, self.level, self.reason
+        seen = set([code >> 1])
+        for index in range(len(self.trail) - 1, self.trail_lim[0] - 1, -1):
+            var = self.trail[index] >> 1
+            if var not in seen:
+                continue
+            seen.discard(var)
+            clause = reason[var]
+            if clause < 0:
+                conflict.append(self.trail[index])
+            else:
+                s = start[clause]
+                for k in range(s + 1, s + size[clause]):
+                    if level[lits[k] >> 1] > 0:
+                        seen.add(lits[k] >> 1)
+        return [self.decode(code) for code in conflict]
+
+    @staticmethod
+    def decode(code):
+        return code >> 1 if code & 1 == 0 else -(code >> 1)
+
+    def cancel_until(self, target):
+        if len(self.trail_lim) <= target:
+            return
+        value, phase, heap, activity = self.value, self.phase, self.heap, self.activity
+        for code in self.trail[self.trail_lim[target]:]:
+            var = code >> 1
+            value[code] = value[code ^ 1] = FREE
+            phase[var] = FALSE if code & 1 else TRUE
+            heapq.heappush(heap, (-activity[var], var))
+        del self.trail[self.trail_lim[target]:]
+        del self.trail_lim[target:]
+        self.qhead = len(self.trail)
+        if len(heap) > 8 * self.nvars + 64:
+            self.heap = [(-activity[v], v) for v in range(1, self.nvars + 1) if value[2 * v] == FREE]
+            heapq.heapify(self.heap)
+
+    def pick_branch(self):
+        "The free variable of highest activity as a literal code, or -1"
+        heap, value = self.heap, self.value
+        while heap:
+            var = heapq.heappop(heap)[1]
+            if value[2 * var] == FREE:
+                return 2 * var + (self.phase[var] == FALSE)
+        return -1
+
+    def solve(self, assumptions=()):
+        """
+        Search for a model of the clauses with the given DIMACS literals
+        forced true.  Returns True (model in self.model()) or False, or
+        None if self.stopped asked the search to end.
+        """
+        self.conflict = []
+        if not self.ok:
+            return False
+        self.new_vars(max([abs(literal) for literal in assumptions] or [0]))
+        assumed = [2 * literal if literal > 0 else -2 * literal + 1 for literal in assumptions]
+        self.cancel_until(0)
+        restart = 1
+        budget = self.restart_base * luby(restart)
+        while True:
+            conflict = self.propagate()
+            if conflict >= 0:
+                self.conflicts += 1
+                budget -= 1
+                if not self.trail_lim:
+                    self.ok = False
+                    return False
+                if self.stopped is not None and self.stopped():
+                    self.cancel_until(0)
+                    return None
+                learned, target = self.analyze(conflict)
+                self.cancel_until(target)
+                if len(learned) == 1:
+                    self.enqueue(learned[0], -1)
+                else:
+                    self.enqueue(learned[0], self.attach(learned))
+                    self.learned += 1
+                continue
+
+            if budget <= 0:
+                self.restarts += 1
+                restart += 1
+                budget = self.restart_base * luby(restart)
+                self.cancel_until(0)
+                continue
+
+            code = -1
+            while len(self.trail_lim) < len(assumed):
+                wanted = assumed[len(self.trail_lim)]
+                if self.value[wanted] == TRUE:
+                    self.trail_lim.append(len(self.trail))
+                elif self.value[wanted] == FALSE:
+                    self.conflict = self.analyze_final(wanted)
+                    self.cancel_until(0)
+                    return False
+                else:
+                    code = wanted
+                    break
+            if code < 0:
+                code = self.pick_branch()
+                if code < 0:
+                    self.saved = [2 * var if self.value[2 * var] == TRUE else 2 * var + 1
+                                  for var in range(1, self.nvars + 1)]
+                    self.cancel_until(0)
+                    return True
+                self.decisions += 1
+            self.trail_lim.append(len(self.trail))
+            self.enqueue(code, -1)
+
+    def model(self):
+        "The assignment found by the last successful solve, as DIMACS literals"
+        return [self.decode(code) for code in self.saved]
+
+def satisfiable(kb):
+    return Solver(kb).solve()
+
+def solve(kb):
+    "A model of kb as a list of literals, or None if kb is unsatisfiable"
+    solver = Solver(kb)
+    return solver.model() if solver.solve() else None
@@ -1,7 +1,7 @@
 '''cluedo.py - project skeleton for a propositional reasoner
 for the game of Clue.  Unimplemented portions have the comment "TO
-BE IMPLEMENTED AS AN EXERCISE".  The reasoner does not include
-knowledge of how many cards each player holds.
+BE IMPLEMENTED AS AN EXERCISE".  Knowledge of how many cards each
+player holds is optional: see hand_sizes and axiom_hand_sizes.
 Originally by Todd Neller
 Ported to Python by Dave Musicant
 Adapted to course needs by Laura Brown
@@ -24,8 +24,14 @@ To receive a copy of the GNU General Public License, write to the Free
 Software Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA
 02111-1307, USA.'''
 
+import cardinality
 import cnf
 
+try:
+    import numpy
+except ImportError:
+    numpy = None        # identifier tables and axioms are built in pure Python
+
 class Cluedo:
     suspects = ['sc', 'mu', 'wh', 'gr', 'pe', 'pl']
     weapons  = ['kn', 'cs', 're', 'ro', 'pi', 'wr']
@@ -46,10 +52,135 @@ class Cluedo:
     """
     @staticmethod
     def getIdentifierFromNames(hand, card):
-        return Cluedo.getIdentifierFromIndicies(Cluedo.hands.index(hand), Cluedo.cards.index(card))
+        return CLASSIC.identifier(hand, card)
+
+
+class GameSpec:
+    """
+    The shape of a Cluedo-like game, which every function of this module
+    and of cluedo_game takes as spec (default CLASSIC, the game of Cluedo):
+
+      categories  lists of card names, one per category, any number of
+                  any size; a suggestion or accusation names one card of
+                  each
+      players     the player names, or how many players there are (named
+                  p1, p2, ...); by default the first category, as in Clue
+                  where the suspects play
+      seating     the players in the order they take turns and refute
+                  suggestions; by default the order of players
+      casefile    the name of the case file hand
+      layout      'hand' numbers the identifiers hand by hand, so card c
+                  in hand h is h * len(cards) + c + 1 as in Cluedo; 'card'
+                  numbers them card by card, c * len(hands) + h + 1
+
+    hands is the players followed by the case file; identifiers run from 1
+    to variables.  hand_index and card_index map names to indices, and
+    table[hand][card] is the identifier of every pair of indices (grid is
+    the same as a NumPy array when NumPy is installed, for building the
+    axioms a block at a time).
+    """
+    LAYOUTS = ('hand', 'card')
+
+    def __init__(self, categories, players=None, seating=None, casefile='cf', layout='hand'):
+        self.categories = [list(category) for category in categories]
+        self.cards = [card for category in self.categories for card in category]
+        if isinstance(players, int):
+            players = ['p%d' % (i + 1) for i in range(players)]
+        self.players = list(self.categories[0] if players is None else players)
+        self.seating = list(self.players if seating is None else seating)
+        self.casefile = casefile
+        self.hands = self.players + [casefile]
+        self.layout = layout
+        self.variables = len(self.hands) * len(self.cards)
+        if layout not in self.LAYOUTS:
+            raise ValueError('unknown identifier layout %r' % layout)
+        if len(set(self.cards)) != len(self.cards) or not all(self.categories):
+            raise ValueError('every category needs cards, and no card can be in two')
+        if len(set(self.hands)) != len(self.hands):
+            raise ValueError('the players and the case file need distinct names')
+        if sorted(self.seating) != sorted(self.players):
+            raise ValueError('the seating order must list every player once')
+        self.hand_index = dict((hand, index) for index, hand in enumerate(self.hands))
+        self.card_index = dict((card, index) for index, card in enumerate(self.cards))
+        if numpy is not None:
+            numbers = numpy.arange(1, self.variables + 1)
+            if layout == 'hand':
+                self.grid = numbers.reshape(len(self.hands), len(self.cards))
+            else:
+                self.grid = numbers.reshape(len(self.cards), len(self.hands)).T
+            self.table = self.grid.tolist()
+        else:
+            self.grid = None
+            self.table = [[self.identifier_at(hand, card) for card in range(len(self.cards))]
+                          for hand in range(len(self.hands))]
+
+    def __repr__(self):
+        return 'GameSpec(%d players, categories of %s cards)' % (
+            len(self.players), ', '.join(str(len(category)) for category in self.categories))
+
+    @classmethod
+    def generic(cls, players, sizes, **options):
+        "A game with the given number of players and categories of the given sizes, cards named a1, a2, ..., b1, ..."
+        categories = [['%s%d' % (chr(ord('a') + i), card + 1) for card in range(size)]
+                      for i, size in enumerate(sizes)]
+        return cls(categories, players, **options)
+
+    def identifier_at(self, hand, card):
+        "The identifier of the card with index card in the hand with index hand"
+        if self.layout == 'hand':
+            return hand * len(self.cards) + card + 1
+        return card * len(self.hands) + hand + 1
+
+    def identifier(self, hand, card):
+        "The identifier of the named card in the named hand"
+        return self.table[self.hand_index[hand]][self.card_index[card]]
+
+    def columns(self):
+        "The identifiers of each card in every hand: the table transposed"
+        if self.grid is not None:
+            return self.grid.T.tolist()
+        return [list(column) for column in zip(*self.table)]
+
+    def category_rows(self, hand):
+        "The identifiers of the cards of each category in the hand with index hand"
+        rows, start = [], 0
+        for category in self.categories:
+            rows.append(self.table[hand][start:start + len(category)])
+            start += len(category)
+        return rows
+
+    def cell(self, literal):
+        "(hand, card) for the variable of literal, or None if it is not one of the game's identifiers"
+        var = abs(literal)
+        if not 0 < var <= self.variables:
+            return None
+        if self.layout == 'hand':
+            hand, card = divmod(var - 1, len(self.cards))
+        else:
+            card, hand = divmod(var - 1, len(self.hands))
+        return self.hands[hand], self.cards[card]
+
+    def following(self, player):
+        "The other players in turn after player, in seating order"
+        position = self.seating.index(player)
+        return self.seating[position + 1:] + self.seating[:position]
+
+def pairwise_block(rows):
+    """
+    The clauses [-a, -b] for every two identifiers a, b of a row, for each
+    of rows (equally long lists or a NumPy array): the same clauses, in
+    the same order, as cardinality.at_most(row, 1) row by row, built in
+    one go by NumPy when it is installed
+    """
+    if numpy is not None:
+        rows = -numpy.asarray(rows)
+        first, second = numpy.triu_indices(rows.shape[1], 1)
+        return numpy.stack((rows[:, first], rows[:, second]), axis=2).reshape(-1, 2).tolist()
+    return [[-row[i], -row[j]] for row in rows for i in range(len(row)) for j in range(i + 1, len(row))]
 
+CLASSIC = GameSpec([Cluedo.suspects, Cluedo.weapons, Cluedo.rooms], casefile=Cluedo.casefile)
 
-def deal(hand, cards):
+def deal(hand, cards, spec=CLASSIC):
     "Construct the CNF clauses for the given cards being in the specified hand"
     "*** YOUR CODE HERE ***"
     # hand = who's hand it is
@@ -58,224 +189,126 @@ def deal(hand, cards):
     returnList = []
     tempList = []
     for c in cards:
-        tempList = Cluedo.getIdentifierFromNames(hand, c)
+        tempList = spec.identifier(hand, c)
         returnList.append([tempList])
         tempList = []
 
     return returnList
 
-def axiom_card_exists():
+def auxiliary_pool(spec=CLASSIC):
+    """
+    A cardinality.Pool for the auxiliary variables of the axioms, numbered
+    after the last hand/card identifier.  Every axiom that goes into one
+    knowledge base must be given the same pool.
+    """
+    return cardinality.Pool(spec.variables)
+
+def axiom_card_exists(encoding='pairwise', pool=None, spec=CLASSIC):
     """
     Construct the CNF clauses which represents:
         'Each card is in at least one place'
+    which is one clause per card in every encoding.
     """
+    return spec.columns()
 
-    "*** YOUR CODE HERE ***"
-    cards = Cluedo.cards
-    hands = Cluedo.hands
-    retList = []
-    tempList = []
-
-    for c in cards:
-        for hand in hands:
-            identifier = Cluedo.getIdentifierFromNames(hand, c)
-            tempList.append(identifier)
-
-        retList.append(tempList)
-        tempList = []
-    
-    return retList
-
-def axiom_card_unique():
+def axiom_card_unique(encoding='pairwise', pool=None, spec=CLASSIC):
     """
     Construct the CNF clauses which represents:
         'If a card is in one place, it can not be in another place'
+    encoding is one of cardinality.ENCODINGS; all but pairwise draw their
+    auxiliary variables from pool (see auxiliary_pool).
     """
-    "*** YOUR CODE HERE ***"
-    cards = Cluedo.cards
-    hands = Cluedo.hands
+    if encoding == 'pairwise':
+        return pairwise_block(spec.columns())
     retList = []
-   
-    for c in range(len(cards)):
-        for i in range(len(hands)):
-            for j in range((i+1), len(hands)):
-                id_i = Cluedo.getIdentifierFromIndicies(i, c)
-                id_j = Cluedo.getIdentifierFromIndicies(j, c)
-                
-                retList.append([-1 * id_i, -1 * id_j])
-    
+    for places in spec.columns():
+        retList.extend(cardinality.at_most(list(places), 1, encoding, pool))
     return retList
 
-def axiom_casefile_exists():
+def axiom_casefile_exists(encoding='pairwise', pool=None, spec=CLASSIC):
     """
     Construct the CNF clauses which represents:
         'At least one card of each category is in the case file'
     """
-    "*** YOUR CODE HERE ***"
-    weapons = Cluedo.weapons
-    suspects = Cluedo.suspects
-    rooms = Cluedo.rooms
-    weaponLoc = []
-    suspectLoc = []
-    roomLoc = []
-    retList = []
-    casefile = Cluedo.casefile
-
-    for w in weapons:
-        weaponLoc.append(Cluedo.getIdentifierFromNames(casefile, w))
+    return spec.category_rows(spec.hand_index[spec.casefile])
 
-    for s in suspects:
-        suspectLoc.append(Cluedo.getIdentifierFromNames(casefile, s))
-
-    for r in rooms:
-        roomLoc.append(Cluedo.getIdentifierFromNames(casefile,r))
-
-    retList.append(weaponLoc)
-    retList.append(suspectLoc)
-    retList.append(roomLoc)
-
-    return retList
-
-def axiom_casefile_unique():
+def axiom_casefile_unique(encoding='pairwise', pool=None, spec=CLASSIC):
     """
     Construct the CNF clauses which represents:
         'No two cards in each category are in the case file'
     """
-    "*** YOUR CODE HERE ***"
-    weapons = Cluedo.weapons
-    suspects = Cluedo.suspects
-    rooms = Cluedo.rooms
-    caseIndex = len(Cluedo.hands) - 1
     retList = []
+    for cards in spec.category_rows(spec.hand_index[spec.casefile]):
+        if encoding == 'pairwise':
+            retList.extend(pairwise_block([cards]))
+        else:
+            retList.extend(cardinality.at_most(cards, 1, encoding, pool))
+    return retList
 
-    for w in range(len(weapons)):
-        for w2 in range(w+1, len(weapons)):
-            id_w = Cluedo.getIdentifierFromIndicies(caseIndex, w)
-            id_w2 = Cluedo.getIdentifierFromIndicies(caseIndex, w2)
-            retList.append([-1 * id_w, -1 * id_w2])
-    
-    for s in range(len(suspects)):
-        for s2 in range(s+1, len(suspects)):
-            id_s = Cluedo.getIdentifierFromIndicies(caseIndex, s)
-            id_s2 = Cluedo.getIdentifierFromIndicies(caseIndex, s2)
-            retList.append([-1 * id_s, -1 * id_s2])
-
-    for r in range(len(rooms)):
-        for r2 in range(r+1, len(rooms)):
-            id_r = Cluedo.getIdentifierFromIndicies(caseIndex, r)
-            id_r2 = Cluedo.getIdentifierFromIndicies(caseIndex, r2)
-            retList.append([-1 * id_r, -1 * id_r2])
-    
+def hand_sizes(hand, cards, spec=CLASSIC):
+    """
+    {player: size} for every player, inferred from the deal of cards to
+    hand: the case file holds one card of each category and the rest are
+    dealt round the players, so each holds the same number or, when they
+    do not divide evenly, one of two numbers, given as a (low, high) pair.
+    The case file is left out, since its axioms already fix its size.
+    """
+    low, extra = divmod(len(spec.cards) - len(spec.categories), len(spec.players))
+    sizes = dict((player, low if extra == 0 else (low, low + 1)) for player in spec.players)
+    sizes[hand] = len(cards)
+    return sizes
+
+def axiom_hand_sizes(sizes, encoding='totalizer', pool=None, spec=CLASSIC):
+    """
+    Construct the CNF clauses which represents:
+        'Each hand holds as many cards as sizes says'
+    sizes maps hands to a number of cards or a (low, high) range, as
+    hand_sizes gives them.  The pairwise encoding needs a clause for every
+    size + 1 cards and the commander one is just as exponential, so the
+    default is the totalizer; pool defaults to a
+    fresh auxiliary_pool, which is only right if no other axiom of the
+    knowledge base draws from one.
+    """
+    pool = auxiliary_pool(spec) if pool is None else pool
+    retList = []
+    for hand in spec.hands:
+        if hand not in sizes:
+            continue
+        low, high = sizes[hand] if isinstance(sizes[hand], tuple) else (sizes[hand], sizes[hand])
+        retList.extend(cardinality.between(spec.table[spec.hand_index[hand]], low, high, encoding, pool))
     return retList
 
-def suggest(suggester, card1, card2, card3, refuter, cardShown):
+def suggest(suggester, card1, card2, card3, refuter, cardShown, spec=CLASSIC):
     "Construct the CNF clauses representing facts and/or clauses learned from a suggestion"
-    "*** YOUR CODE HERE ***"
-    suspects = Cluedo.suspects
-    cards = Cluedo.cards
-
-    # Case 3: No Refuter
-    # Gained information: All of the suspects have none of the cards
-    if ((refuter == None) and (cardShown == None)):
-        i = suspects.index(suggester)
-        j = suspects.index(suggester) - 1
-        infoList = []
-        
-        while (i != j):         
-            # Cycle through suspect list
-            i += 1
-            if (i == len(suspects)):
-                i = 0
-            
-            # Card indices
-            c1 = cards.index(card1)
-            c2 = cards.index(card2)
-            c3 = cards.index(card3)
-
-            # Gather information
-            infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c1)])
-            infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c2)])
-            infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c3)])
-    
-        return infoList
-    
-    # Case 2: A card is hidden
-    # Gained information: Not refuters have none of the cards.
-    #                     The refuter has at least one of the cards
-    elif (cardShown == None):
-        i = suspects.index(suggester)
-        j = suspects.index(refuter)
-        infoList = []
-        
-        while (i != j):         
-            # Cycle through suspect list
-            i += 1
-            if (i == len(suspects)):
-                i = 0
-            
-            # Card indices
-            c1 = cards.index(card1)
-            c2 = cards.index(card2)
-            c3 = cards.index(card3)
-
-            # Gather information
-            # Not the refuters turn
-            if (i != j):
-                infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c1)])
-                infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c2)])
-                infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c3)])
-            # The refuter's turn
-            elif (i == j):
-                rIndex = suspects.index(refuter)
-                infoList.append([Cluedo.getIdentifierFromIndicies(rIndex, c1),
-                                Cluedo.getIdentifierFromIndicies(rIndex, c2), 
-                                Cluedo.getIdentifierFromIndicies(rIndex, c3)])
-
-        return infoList
-    
-    # Case 1: There is a refuter and they show their card
-    # Gained information: Not reguters have none of the cards.
-    #                     The refuter has cardShown.
-    else:
-        i = suspects.index(suggester)
-        j = suspects.index(refuter)
-        infoList = []
-
-        while (i != j):
-            
-            # Cycle through suspect list
-            i += 1
-            if (i == len(suspects)):
-                i = 0
-            
-            # Card indices
-            c1 = cards.index(card1)
-            c2 = cards.index(card2)
-            c3 = cards.index(card3)
-
-            # Gather information
-            # Not the refuters turn
-            if (i != j):
-                infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c1)])
-                infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c2)])
-                infoList.append([-1 * Cluedo.getIdentifierFromIndicies(i, c3)])
-            # The refuter's turn
-            elif (i == j):
-                infoList.append([Cluedo.getIdentifierFromNames(refuter, cardShown)])
-
-        return infoList
-    
-    return None
+    return suggestion(suggester, [card1, card2, card3], refuter, cardShown, spec)
 
-def accuse(accuser, card1, card2, card3, correct):
+def suggestion(suggester, cards, refuter, cardShown, spec=CLASSIC):
+    """
+    suggest for a suggestion of any number of cards: the players after the
+    suggester in seating order have none of the cards, up to the refuter
+    (None if nobody could refute), who has cardShown or, if we did not
+    see it (None), at least one of the cards
+    """
+    infoList = []
+    for player in spec.following(suggester):
+        if player == refuter:
+            if cardShown is None:
+                infoList.append([spec.identifier(player, card) for card in cards])
+            else:
+                infoList.append([spec.identifier(player, cardShown)])
+            break
+        infoList.extend([-spec.identifier(player, card)] for card in cards)
+    return infoList
+
+def accuse(accuser, card1, card2, card3, correct, spec=CLASSIC):
     "Construct the CNF clauses representing facts and/or clauses learned from an accusation"
     "*** YOUR CODE HERE ***"
-    casefile = Cluedo.casefile
+    casefile = spec.casefile
     retList = []
 
-    c1 = Cluedo.getIdentifierFromNames(casefile, card1)
-    c2 = Cluedo.getIdentifierFromNames(casefile, card2)
-    c3 = Cluedo.getIdentifierFromNames(casefile, card3)
+    c1 = spec.identifier(casefile, card1)
+    c2 = spec.identifier(casefile, card2)
+    c3 = spec.identifier(casefile, card3)
 
     if (correct):
         retList.append([c1])
@@ -285,8 +318,8 @@ def accuse(accuser, card1, card2, card3, correct):
         # In not correct, we learn that card1, card2, and card3 are not in the case file
         # card1, card2, and card3 are not in the accusers hand.
         retList.append([-1 * c1, -1 * c2, -1 * c3])
-        retList.append([-1 * Cluedo.getIdentifierFromNames(accuser, card1)])
-        retList.append([-1 * Cluedo.getIdentifierFromNames(accuser, card2)])
-        retList.append([-1 * Cluedo.getIdentifierFromNames(accuser, card3)])
+        retList.append([-1 * spec.identifier(accuser, card1)])
+        retList.append([-1 * spec.identifier(accuser, card2)])
+        retList.append([-1 * spec.identifier(accuser, card3)])
     
     return retList
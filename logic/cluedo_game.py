@@ -1,67 +1,584 @@
+import asyncio
+import collections
+import itertools
+import random
+import time
+import weakref
+
+import cardinality
 import cnf
 import cluedo
 
-def query(kb, player, card):
-    if cnf.entails(kb,  cluedo.Cluedo.getIdentifierFromNames(player, card)): return 'Y'
-    if cnf.entails(kb, -cluedo.Cluedo.getIdentifierFromNames(player, card)): return 'N'
+ANSWERS = {cnf.ENTAILED: 'Y', cnf.REFUTED: 'N', cnf.UNKNOWN: '-'}
+
+def query(kb, player, card, workers=None, spec=cluedo.CLASSIC):
+    literal = spec.identifier(player, card)
+    return ANSWERS[cnf.entails_many(kb, [literal], workers=workers)[literal]]
+
+def notepad(kb, players=None, workers=None, spec=cluedo.CLASSIC):
+    """
+    {(player, card): 'Y'/'N'/'-'} for every player (default: all hands)
+    and card.  workers > 1 spreads the cells over that many workers
+    (see cnf.ParallelSession); the grid is the same either way.
+    """
+    players = spec.hands if players is None else players
+    cells = dict(((player, card), spec.identifier(player, card))
+                 for player in players for card in spec.cards)
+    backbone = cnf.backbone(kb, cells.values(), workers=workers)
+    if backbone is None:
+        # an inconsistent kb entails everything, as query would report
+        return dict((cell, 'Y') for cell in cells)
+    return dict((cell, 'Y' if literal in backbone else 'N' if -literal in backbone else '-')
+                for cell, literal in cells.items())
+
+class Notepad:
+    """
+    notepad kept up to date as kb grows.  kb (a CNFArray or list) is the
+    caller's: add clauses to it as the game goes on and call refresh for
+    the new grid.  The cells are decided on a cnf.session of the notepad's
+    own, so close it when done (or use it in a with statement).
+
+    A decided cell stays decided, since clauses are only ever added, so
+    refresh only reconsiders the undecided cells that the new clauses can
+    reach: the clauses are simplified by the decided cells (a clause with a
+    true cell is dropped, a false cell is left out of its clause) and split
+    into groups that share no variable, and cells whose group holds no new
+    clause keep their '-'.  The models found along the way are kept while
+    they satisfy the new clauses too, and a cell that is true in one of
+    them and false in another stays '-' without asking the solver; only
+    the rest are queried.  Once every cell is decided, refresh still checks
+    that the new clauses leave kb consistent.  queries counts the solver
+    calls.
+    """
+
+    def __init__(self, kb, players=None, backend=None, spec=cluedo.CLASSIC):
+        self.kb = kb
+        players = spec.hands if players is None else players
+        self.cells = dict(((player, card), spec.identifier(player, card))
+                          for player in players for card in spec.cards)
+        self.owners = dict((literal, cell) for cell, literal in self.cells.items())
+        self.grid = dict((cell, '-') for cell in self.cells)
+        self.session = cnf.session((), backend)
+        self.models = []
+        self.seen = 0
+        self.queries = 0
+        self.consistent = True
+
+    def close(self):
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+    def __getitem__(self, cell):
+        return self.grid[cell]
+
+    def missing(self, cells):
+        "The literals of cells that are true in none of the models kept"
+        return [literal for cell in cells for literal in (self.cells[cell], -self.cells[cell])
+                if not any(literal in model for model in self.models)]
+
+    def witness(self, literal):
+        "Does kb have a model with literal true?  The model is kept if there is one"
+        self.queries += 1
+        if not self.session.satisfiable([literal]):
+            return False
+        if self.session.model is not None:
+            self.models.append(set(self.session.model))
+        return True
+
+    def reachable(self, new):
+        "The undecided cells in a group of the simplified clauses that holds one of new"
+        value = {}
+        for cell, literal in self.cells.items():
+            if self.grid[cell] != '-':
+                value[literal] = self.grid[cell] == 'Y'
+        parent = {}
+        def find(var):
+            root = var
+            while parent.get(root, root) != root:
+                root = parent[root]
+            while var != root:
+                parent[var], var = root, parent[var]
+            return root
+        def group(clause):
+            "The root of the variables of clause left after simplifying, None if it is satisfied"
+            free = []
+            for literal in clause:
+                if abs(literal) not in value:
+                    free.append(abs(literal))
+                elif value[abs(literal)] == (literal > 0):
+                    return None
+            root = find(free[0]) if free else 0
+            for var in free[1:]:
+                other = find(var)
+                if other != root:
+                    parent[other] = root
+            return root
+        for clause in self.kb:
+            group(clause)
+        touched = set(find(root) for root in map(group, new) if root is not None)
+        return [cell for cell, answer in self.grid.items() if answer == '-' and find(self.cells[cell]) in touched]
+
+    def refresh(self):
+        "The notepad grid of kb as it is now"
+        new, self.seen = self.kb[self.seen:], len(self.kb)
+        if not new or not self.consistent:
+            # an inconsistent kb has every cell decided ('Y') already
+            return self.grid
+        self.session.add(new)
+        self.models = [model for model in self.models if not any(model.isdisjoint(clause) for clause in new)]
+        if not self.models:
+            self.queries += 1
+            if not self.session.satisfiable():
+                self.consistent = False
+                self.grid = dict((cell, 'Y') for cell in self.grid)
+                return self.grid
+            if self.session.model is not None:
+                self.models.append(set(self.session.model))
+        if '-' not in self.grid.values():
+            return self.grid
+        cells = self.reachable(new)
+        # a model with any of the missing literals true shows those, and if
+        # there is none, each of them is refuted and its cell decided
+        missing = self.missing(cells)
+        while missing:
+            self.queries += 1
+            if not self.session.satisfiable(clauses=[missing]):
+                break
+            if self.session.model is None:
+                # a backend without models: one literal at a time
+                missing = [literal for literal in missing if not self.witness(literal)]
+                break
+            model = set(self.session.model)
+            self.models.append(model)
+            missing = [literal for literal in missing if literal not in model]
+        for literal in missing:
+            self.grid[self.owners[abs(literal)]] = 'N' if literal > 0 else 'Y'
+        return self.grid
+
+async def query_async(kb, player, card, timeout=None, spec=cluedo.CLASSIC):
+    "query on the zchaff executable without blocking the event loop"
+    literal = spec.identifier(player, card)
+    if await cnf.entails_async(kb,  literal, timeout): return 'Y'
+    if await cnf.entails_async(kb, -literal, timeout): return 'N'
     return '-'
 
-def printNotepad(clauses):
-    for player in cluedo.Cluedo.suspects:
+async def notepad_async(kb, players=None, timeout=None, spec=cluedo.CLASSIC):
+    """
+    notepad for asyncio: every cell is queried concurrently (cnf.MAX_PROCESSES
+    solver processes at a time)
+    """
+    players = spec.hands if players is None else players
+    cells = [(player, card) for player in players for card in spec.cards]
+    answers = await asyncio.gather(*[query_async(kb, player, card, timeout, spec) for player, card in cells])
+    return dict(zip(cells, answers))
+
+def printGrid(grid, show=str, spec=cluedo.CLASSIC):
+    for player in spec.players:
         print('\t', player, end="")
-    print('\t', cluedo.Cluedo.casefile)
+    print('\t', spec.casefile)
 
-    for card in cluedo.Cluedo.cards:
+    for card in spec.cards:
         print(card, '\t', end="")
-        for player in cluedo.Cluedo.suspects:
-            print(query(clauses, player, card), '\t', end="")
-        print(query(clauses, cluedo.Cluedo.casefile, card))
+        for player in spec.players:
+            print(show(grid[player, card]), '\t', end="")
+        print(show(grid[spec.casefile, card]))
 
-def play_cluedo(output=True):
-    clauses = cluedo.axiom_card_exists() + cluedo.axiom_card_unique() + cluedo.axiom_casefile_exists() + cluedo.axiom_casefile_unique()
-    clauses.extend(cluedo.deal("sc", ["wh", "li", "st"]))
-    if output:
-        print('After deal: should show that the cards dealt to us are in our hand and only our hand.')
-        printNotepad(clauses)
-        print
-    clauses.extend(cluedo.suggest("sc", "sc", "ro", "lo", "mu", "sc"))
-    clauses.extend(cluedo.suggest("mu", "pe", "pi", "di", "pe", None))
-    clauses.extend(cluedo.suggest("wh", "mu", "re", "ba", "pe", None))
-    clauses.extend(cluedo.suggest("gr", "wh", "kn", "ba", "pl", None))
-    clauses.extend(cluedo.suggest("pe", "gr", "cs", "di", "wh", None))
-    clauses.extend(cluedo.suggest("pl", "wh", "wr", "st", "sc", "wh"))
-    clauses.extend(cluedo.suggest("sc", "pl", "ro", "co", "mu", "pl"))
-    clauses.extend(cluedo.suggest("mu", "pe", "ro", "ba", "wh", None))
-    clauses.extend(cluedo.suggest("wh", "mu", "cs", "st", "gr", None))
-    clauses.extend(cluedo.suggest("gr", "pe", "kn", "di", "pe", None))
-    clauses.extend(cluedo.suggest("pe", "mu", "pi", "di", "pl", None))
-    clauses.extend(cluedo.suggest("pl", "gr", "kn", "co", "wh", None))
-    clauses.extend(cluedo.suggest("sc", "pe", "kn", "lo", "mu", "lo"))
-    clauses.extend(cluedo.suggest("mu", "pe", "kn", "di", "wh", None))
-    clauses.extend(cluedo.suggest("wh", "pe", "wr", "ha", "gr", None))
-    clauses.extend(cluedo.suggest("gr", "wh", "pi", "co", "pl", None))
-    clauses.extend(cluedo.suggest("pe", "sc", "pi", "ha", "mu", None))
-    clauses.extend(cluedo.suggest("pl", "pe", "pi", "ba", None, None))
-    clauses.extend(cluedo.suggest("sc", "wh", "pi", "ha", "pe", "ha"))
-    clauses.extend(cluedo.suggest("wh", "pe", "pi", "ha", "pe", None))
-    clauses.extend(cluedo.suggest("pe", "pe", "pi", "ha", None, None))
-    clauses.extend(cluedo.suggest("sc", "gr", "pi", "st", "wh", "gr"))
-    clauses.extend(cluedo.suggest("mu", "pe", "pi", "ba", "pl", None))
-    clauses.extend(cluedo.suggest("wh", "pe", "pi", "st", "sc", "st"))
-    clauses.extend(cluedo.suggest("gr", "wh", "pi", "st", "sc", "wh"))
-    clauses.extend(cluedo.suggest("pe", "wh", "pi", "st", "sc", "wh"))
-    clauses.extend(cluedo.suggest("pl", "pe", "pi", "ki", "gr", None))
-    if output:
-        print('Before accusation: should show a single solution.')
-        printNotepad(clauses)
-        print("")
-    clauses.extend(cluedo.accuse("sc", "pe", "pi", "bi", True))
+def printNotepad(clauses, workers=None, spec=cluedo.CLASSIC):
+    printGrid(notepad(clauses, workers=workers, spec=spec), spec=spec)
+
+# the base axioms a DealCounter builds in, by the name their batches are tagged with
+AXIOM_NAMES = ('axiom_card_exists', 'axiom_card_unique', 'axiom_casefile_exists', 'axiom_casefile_unique')
+
+class HandSizes:
+    "The origin deal() tags its hand size axioms with: their sizes and encoding"
+
+    def __init__(self, sizes, encoding):
+        self.sizes = sizes
+        self.encoding = encoding
+
+    def __repr__(self):
+        return 'axiom_hand_sizes(%r)' % self.encoding
+
+class DealCounter:
+    """
+    The deals a Cluedo knowledge base allows, counted exactly by dealing
+    the cards one by one in spec.cards order.  Every card goes to one
+    hand, the case file gets one card of each category and each hand of
+    sizes (hand: size or (low, high), as cluedo.hand_sizes gives them)
+    ends up with that many cards; clauses are any further clauses over
+    the hand/card identifiers.  A partial deal is summed up by its state:
+    the number of cards of each sized hand so far, whether the case file
+    has a card of the current category, and which clauses that still have
+    cards to come are satisfied already.  ways[i][state] is the number of
+    ways to deal the cards from i on, so total is the number of deals.
+    """
+
+    def __init__(self, clauses, sizes, spec=cluedo.CLASSIC):
+        self.spec = spec
+        hands, cards = len(spec.hands), len(spec.cards)
+        self.casefile = spec.hand_index[spec.casefile]
+        self.sized = [spec.hand_index[hand] for hand in spec.hands if hand in sizes]
+        self.slot = dict((hand, index) for index, hand in enumerate(self.sized))
+        self.bounds = [sizes[spec.hands[hand]] if isinstance(sizes[spec.hands[hand]], tuple)
+                       else (sizes[spec.hands[hand]],) * 2 for hand in self.sized]
+        self.last = set(itertools.accumulate(len(category) for category in spec.categories))
+        # the hands each card can still go to, narrowed by the unit clauses
+        self.allowed = [set(range(hands)) for card in range(cards)]
+        clauses = [[(spec.hand_index[hand], spec.card_index[card], literal > 0)
+                    for literal in clause for hand, card in [spec.cell(literal)]] for clause in clauses]
+        changed = True
+        while changed:
+            changed, remaining = False, []
+            for clause in clauses:
+                # each literal is true, false or still open
+                values = [None if len(self.allowed[card]) > 1 and hand in self.allowed[card]
+                          else (hand in self.allowed[card]) == positive for hand, card, positive in clause]
+                if True in values:
+                    continue
+                clause = [literal for literal, value in zip(clause, values) if value is None]
+                if len(clause) == 1:
+                    hand, card, positive = clause[0]
+                    self.allowed[card] = {hand} if positive else self.allowed[card] - {hand}
+                    changed = True
+                elif not clause:
+                    # no deal satisfies kb
+                    self.allowed[0] = set()
+                else:
+                    remaining.append(clause)
+            clauses = remaining
+        self.clauses = clauses
+        # (clause index, hands satisfying it) at each card, and the clauses ending there
+        self.checks = [[] for card in range(cards)]
+        self.ends = [[] for card in range(cards)]
+        for index, clause in enumerate(clauses):
+            for card in sorted(set(card for hand, card, positive in clause)):
+                satisfying = set(hand for hand, other, positive in clause if other == card and positive)
+                for hand, other, positive in clause:
+                    if other == card and not positive:
+                        satisfying |= set(range(hands)) - {hand}
+                self.checks[card].append((index, satisfying))
+            self.ends[max(card for hand, card, positive in clause)].append(index)
+        self.start = (tuple(0 for hand in self.sized), False, frozenset())
+        self.layers = [{self.start: 1}]
+        for card in range(cards):
+            layer = collections.defaultdict(int)
+            for state, ways in self.layers[-1].items():
+                for hand in self.allowed[card]:
+                    following = self.step(card, state, hand)
+                    if following is not None:
+                        layer[following] += ways
+            self.layers.append(layer)
+        self.ways = [None] * cards + [dict((state, 1) for state in self.layers[-1]
+                                           if all(low <= count for count, (low, high) in zip(state[0], self.bounds)))]
+        for card in range(cards - 1, -1, -1):
+            following = self.ways[card + 1]
+            self.ways[card] = dict((state, sum(following.get(self.step(card, state, hand), 0)
+                                               for hand in self.allowed[card]))
+                                   for state in self.layers[card])
+        self.total = self.ways[0][self.start]
+
+    def step(self, card, state, hand):
+        "The state after card goes to hand, or None if that deals no deal"
+        counts, filed, satisfied = state
+        if hand == self.casefile:
+            if filed:
+                return None
+            filed = True
+        if hand in self.slot:
+            index = self.slot[hand]
+            if counts[index] == self.bounds[index][1]:
+                return None
+            counts = counts[:index] + (counts[index] + 1,) + counts[index + 1:]
+        if card + 1 in self.last:
+            if not filed:
+                return None
+            filed = False
+        # the sized hands short of their lower bound need the cards left
+        left = len(self.spec.cards) - card - 1
+        if sum(max(low - count, 0) for count, (low, high) in zip(counts, self.bounds)) > left:
+            return None
+        added = [index for index, hands in self.checks[card] if hand in hands]
+        if added:
+            satisfied = satisfied.union(added)
+        for index in self.ends[card]:
+            if index not in satisfied:
+                return None
+        if self.ends[card]:
+            satisfied = satisfied.difference(self.ends[card])
+        return counts, filed, satisfied
+
+    def marginals(self):
+        "{(hand, card): number of deals with card in hand}"
+        spec = self.spec
+        counts = {}
+        for card in range(len(spec.cards)):
+            following = self.ways[card + 1]
+            for hand in range(len(spec.hands)):
+                counts[spec.hands[hand], spec.cards[card]] = sum(
+                    ways * following.get(self.step(card, state, hand), 0)
+                    for state, ways in self.layers[card].items()) if hand in self.allowed[card] else 0
+        return counts
+
+    def samples(self, rng):
+        "Uniformly chosen deals without end, each as the list of its literals"
+        spec = self.spec
+        while self.total:
+            state, deal = self.start, []
+            for card in range(len(spec.cards)):
+                pick = rng.randrange(self.ways[card][state])
+                for hand in self.allowed[card]:
+                    following = self.step(card, state, hand)
+                    weight = self.ways[card + 1].get(following, 0)
+                    if pick < weight:
+                        break
+                    pick -= weight
+                state = following
+                deal.append(spec.table[hand][card])
+            chosen = set(deal)
+            yield [var if var in chosen else -var for var in range(1, spec.variables + 1)]
+
+def deal_counter(kb, spec=cluedo.CLASSIC):
+    """
+    A DealCounter for kb, or None if kb is not a CNFArray that a
+    DealCounter can count: one holding the base_axioms (whose batches
+    tell what they say) and otherwise only hand size axioms from deal()
+    and clauses over the hand/card identifiers
+    """
+    kb = kb.kb if isinstance(kb, cnf.Session) else kb
+    if not isinstance(kb, cnf.CNFArray) or not kb.origins:
+        return None
+    axioms, sizes, clauses = set(), {}, []
+    ends = kb.starts[1:] + [len(kb)]
+    batches = [(0, kb.starts[0], None)] + list(zip(kb.starts, ends, kb.origins))
+    for start, end, origin in batches:
+        if isinstance(origin, HandSizes):
+            for hand, size in origin.sizes.items():
+                low, high = size if isinstance(size, tuple) else (size, size)
+                if hand in sizes:
+                    low, high = max(low, sizes[hand][0]), min(high, sizes[hand][1])
+                sizes[hand] = (low, high)
+        elif isinstance(origin, str) and origin.split('(')[0] in AXIOM_NAMES:
+            axioms.add(origin.split('(')[0])
+        else:
+            for clause in kb[start:end]:
+                if not all(spec.cell(literal) for literal in clause):
+                    return None
+                clauses.append(clause)
+    if len(axioms) < len(AXIOM_NAMES):
+        return None
+    return DealCounter(clauses, sizes, spec)
+
+def count_deals(kb, spec=cluedo.CLASSIC):
+    "The number of deals kb allows, not counting auxiliary variables"
+    counter = deal_counter(kb, spec)
+    if counter is not None:
+        return counter.total
+    return cnf.count_models(kb, range(1, spec.variables + 1))
+
+def probabilities(kb, players=None, spec=cluedo.CLASSIC):
+    """
+    {(player, card): probability} that card is in player's hand, taking
+    every deal that kb allows as equally likely.  The deals are counted
+    by a DealCounter where one applies (a game from new_game, as deal and
+    record build it) and by cnf.marginals otherwise, leaving out the
+    auxiliary variables of the axioms.
+    """
+    players = spec.hands if players is None else players
+    cells = dict(((player, card), spec.identifier(player, card))
+                 for player in players for card in spec.cards)
+    counter = deal_counter(kb, spec)
+    if counter is not None:
+        total, counts = counter.total, counter.marginals()
+        counts = dict((cells[cell], counts[cell]) for cell in cells)
+    else:
+        total, counts = cnf.marginals(kb, cells.values(), range(1, spec.variables + 1))
+    if total == 0:
+        # an inconsistent kb entails everything, as notepad reports
+        return dict((cell, 1.0) for cell in cells)
+    return dict((cell, counts[literal] / total) for cell, literal in cells.items())
+
+def estimates(kb, samples=100, budget=None, seed=None, players=None, spec=cluedo.CLASSIC):
+    """
+    {(player, card): (p, low, high)}: the probabilities of probabilities()
+    estimated from sampled models, with 95% intervals.  Sampling stops
+    after samples models or budget seconds, whichever comes first.  The
+    deals are drawn by a DealCounter where one applies and by
+    cnf.estimate_marginals otherwise; if its budget allowed no uniform
+    sampling, low and high are None.
+    """
+    players = spec.hands if players is None else players
+    cells = dict(((player, card), spec.identifier(player, card))
+                 for player in players for card in spec.cards)
+    counter = deal_counter(kb, spec)
+    if counter is not None:
+        deadline = None if budget is None else time.perf_counter() + budget
+        models = itertools.islice(counter.samples(random.Random(seed)), samples)
+        estimate, n = cnf.tally(models, cells.values(), deadline)
+    else:
+        estimate, n, uniform = cnf.estimate_marginals(kb, cells.values(), samples, budget, seed)
+    if estimate is None:
+        return dict((cell, (1.0, 1.0, 1.0)) for cell in cells)
+    return dict((cell, estimate[literal]) for cell, literal in cells.items())
+
+def printProbabilities(clauses, spec=cluedo.CLASSIC):
+    printGrid(probabilities(clauses, spec=spec), lambda p: '%.2f' % p, spec)
+
+def printEstimates(clauses, samples=100, budget=None, spec=cluedo.CLASSIC):
+    printGrid(estimates(clauses, samples, budget, spec=spec), lambda estimate: '%.2f' % estimate[0], spec)
+
+def casefile_candidates(kb, limit=None, spec=cluedo.CLASSIC):
+    """
+    The case file contents kb still allows, as tuples of cards in
+    spec.cards order, listed in one pass of cnf.iter_models over the
+    case file variables
+    """
+    casefile = spec.casefile
+    variables = dict((spec.identifier(casefile, card), card) for card in spec.cards)
+    candidates = []
+    for model in cnf.iter_models(kb, project=variables, limit=limit):
+        candidates.append(tuple(variables[literal] for literal in model if literal > 0))
+    return sorted(candidates)
+
+def record(kb, function, *args):
+    "kb.extend(function(*args)), with the call tagged on the clauses as their origin (see explain)"
+    kb.extend(function(*args), origin='%s(%s)' % (function.__name__, ', '.join(repr(arg) for arg in args)))
+    return kb
+
+# base_axioms' cache: {spec: {encoding: CNFArray}}, dropped with its spec
+AXIOMS = weakref.WeakKeyDictionary()
+
+def base_axioms(encoding='pairwise', spec=cluedo.CLASSIC):
+    """
+    The axioms of a game of shape spec (cluedo.GameSpec) as a read-only
+    cnf.CNFView, each batch tagged with the axiom it comes from; encoding
+    is the cardinality encoding of their at-most-one parts.  They are
+    built once per spec and encoding and shared after that.
+    """
+    cache = AXIOMS.setdefault(spec, {})
+    if encoding not in cache:
+        kb = cnf.CNFArray()
+        pool = cluedo.auxiliary_pool(spec)
+        for axiom in (cluedo.axiom_card_exists, cluedo.axiom_card_unique, cluedo.axiom_casefile_exists, cluedo.axiom_casefile_unique):
+            kb.extend(axiom(encoding, pool, spec), origin='%s(%s)' % (axiom.__name__, '' if encoding == 'pairwise' else repr(encoding)))
+        cache[encoding] = kb
+    return cnf.CNFView([cache[encoding]])
+
+def new_game(encoding='pairwise', spec=cluedo.CLASSIC):
+    "A CNFArray of its own holding the base_axioms, to add a game's clauses to"
+    return cnf.CNFArray(base_axioms(encoding, spec))
+
+def deal(kb, hand, cards, encoding='totalizer', spec=cluedo.CLASSIC):
+    """
+    Record the deal of cards to hand on the CNFArray kb, with the hand
+    sizes it implies (cluedo.hand_sizes) in the given cardinality encoding
+    """
+    kb.extend(cluedo.deal(hand, cards, spec), origin='deal(%r, %r)' % (hand, cards))
+    sizes = cluedo.hand_sizes(hand, cards, spec)
+    pool = cardinality.Pool(max(kb.nvars, spec.variables))
+    kb.extend(cluedo.axiom_hand_sizes(sizes, encoding, pool, spec), origin=HandSizes(sizes, encoding))
+    return kb
+
+def name(literal, spec=cluedo.CLASSIC):
+    """
+    'hand:card' for a Cluedo literal, or 'aux:n' for an auxiliary
+    variable of the axioms, prefixed with ~ if it is negative
+    """
+    cell = spec.cell(literal)
+    if cell is None:
+        return '%saux:%d' % ('~' if literal < 0 else '', abs(literal))
+    return '%s%s:%s' % (('~' if literal < 0 else '',) + cell)
+
+def explain(kb, player, card, spec=cluedo.CLASSIC):
+    """
+    Why notepad shows 'Y' or 'N' for (player, card): the (clause, origin)
+    pairs of a minimal set of clauses of kb that force it (cnf.explain),
+    or None if the cell is '-'
+    """
+    literal = spec.identifier(player, card)
+    core = cnf.explain(kb, literal)
+    if core is None:
+        core = cnf.explain(kb, -literal)
+    if core is None:
+        return None
+    return [(clause, origin) for index, clause, origin in core]
+
+def printExplanation(kb, player, card, spec=cluedo.CLASSIC):
+    core = explain(kb, player, card, spec)
+    if core is None:
+        print('%s: nothing is known' % name(spec.identifier(player, card), spec))
+        return
+    print('%s: %s, because of' % (name(spec.identifier(player, card), spec), query(kb, player, card, spec=spec)))
+    for clause, origin in core:
+        print('  %-40s from %s' % (' | '.join(name(literal, spec) for literal in clause), origin or 'kb'))
+
+# (suggester, card1, card2, card3, refuter, cardShown) for each turn of play_cluedo
+SUGGESTIONS = [
+    ("sc", "sc", "ro", "lo", "mu", "sc"),
+    ("mu", "pe", "pi", "di", "pe", None),
+    ("wh", "mu", "re", "ba", "pe", None),
+    ("gr", "wh", "kn", "ba", "pl", None),
+    ("pe", "gr", "cs", "di", "wh", None),
+    ("pl", "wh", "wr", "st", "sc", "wh"),
+    ("sc", "pl", "ro", "co", "mu", "pl"),
+    ("mu", "pe", "ro", "ba", "wh", None),
+    ("wh", "mu", "cs", "st", "gr", None),
+    ("gr", "pe", "kn", "di", "pe", None),
+    ("pe", "mu", "pi", "di", "pl", None),
+    ("pl", "gr", "kn", "co", "wh", None),
+    ("sc", "pe", "kn", "lo", "mu", "lo"),
+    ("mu", "pe", "kn", "di", "wh", None),
+    ("wh", "pe", "wr", "ha", "gr", None),
+    ("gr", "wh", "pi", "co", "pl", None),
+    ("pe", "sc", "pi", "ha", "mu", None),
+    ("pl", "pe", "pi", "ba", None, None),
+    ("sc", "wh", "pi", "ha", "pe", "ha"),
+    ("wh", "pe", "pi", "ha", "pe", None),
+    ("pe", "pe", "pi", "ha", None, None),
+    ("sc", "gr", "pi", "st", "wh", "gr"),
+    ("mu", "pe", "pi", "ba", "pl", None),
+    ("wh", "pe", "pi", "st", "sc", "st"),
+    ("gr", "wh", "pi", "st", "sc", "wh"),
+    ("pe", "wh", "pi", "st", "sc", "wh"),
+    ("pl", "pe", "pi", "ki", "gr", None),
+]
+
+def play_cluedo(output=True, workers=None, sizes=False):
+    """
+    Replay the game of SUGGESTIONS.  The notepad is refreshed
+    incrementally (Notepad), or recomputed in full on that many workers
+    when workers is given.  With sizes, the deal adds the hand size axioms
+    (see deal).
+    """
+    if sizes:
+        clauses = deal(new_game(), "sc", ["wh", "li", "st"])
+    else:
+        clauses = record(new_game(), cluedo.deal, "sc", ["wh", "li", "st"])
+    with Notepad(clauses) as pad:
+        grid = (lambda: notepad(clauses, workers=workers)) if workers else pad.refresh
+        if output:
+            print('After deal: should show that the cards dealt to us are in our hand and only our hand.')
+            printGrid(grid())
+            print
+        for suggestion in SUGGESTIONS:
+            record(clauses, cluedo.suggest, *suggestion)
+        if output:
+            print('Before accusation: should show a single solution.')
+            printGrid(grid())
+            print("")
+        record(clauses, cluedo.accuse, "sc", "pe", "pi", "bi", True)
+        if output:
+            print('After accusation: if consistent, output should remain unchanged.')
+            printGrid(grid())
+            print("")
+        casefile = [card for card in cluedo.CLASSIC.cards if grid()[cluedo.CLASSIC.casefile, card] == 'Y']
     if output:
-        print('After accusation: if consistent, output should remain unchanged.')
-        printNotepad(clauses)
-        print("")
-        print('Contents of the case file: %s' % [card for card in cluedo.Cluedo.cards if query(clauses, cluedo.Cluedo.casefile, card) == 'Y'])
-    return [card for card in cluedo.Cluedo.cards if query(clauses, cluedo.Cluedo.casefile, card) == 'Y']
+        print('Contents of the case file: %s' % casefile)
+    return casefile
 
 if __name__ == "__main__":
     play_cluedo()
@@ -22,46 +22,1813 @@ Software Foundation, Inc., 59 Temple Place - Suite 330, Boston, MA
 02111-1307, USA.
 '''
 
+from array import array
+import asyncio
+import atexit
+import bisect
+import collections
+import concurrent.futures
+import hashlib
+import itertools
+import math
 import os.path
+import pickle
+import queue
 import subprocess
+import sys
 import tempfile
+import threading
+import time
+import weakref
 
-def satisfiable(kb):
-    if not os.path.exists('./zchaff'):
-        raise RuntimeError('could not locate zchaff executable')
+# Name of the engine behind satisfiable/entails; see BACKENDS below.
+BACKEND = 'zchaff'
+
+# Run preprocess.simplify on every knowledge base before it reaches the
+# backend (once per knowledge base, see preprocessed).
+PREPROCESS = False
+
+# Default number of workers for entails_many/backbone; 0 means one per core.
+WORKERS = 1
+
+# The walksat backend: flips of local search per variable before
+# LOCAL_SEARCH_FALLBACK decides the instance instead, and the seed of its
+# random numbers (None replays util.FixedRandom, so answers are reproducible).
+LOCAL_SEARCH_FLIPS = 10
+LOCAL_SEARCH_FALLBACK = 'cdcl'
+LOCAL_SEARCH_SEED = None
+
+# The cubes backend (cube-and-conquer): decisions per cube (None picks enough
+# for about CUBES_PER_WORKER cubes per worker) and the backend solving them.
+CUBE_DEPTH = None
+CUBES_PER_WORKER = 4
+CUBE_BACKEND = 'cdcl'
+
+class CNFArray:
+    """
+    A knowledge base stored flat: every literal in one array('i') and, for
+    each clause, the offset just past its last literal.  Appending clauses
+    is amortized O(1) per literal and validates them on the way in, so a
+    CNFArray never has to be checked again.  Iterating yields each clause
+    as a list, so a CNFArray can stand in for a list of lists; adding
+    clauses with + gives a CNFView instead of copying the buffer.
+
+    A batch of clauses can be tagged with its origin (e.g. the cluedo call
+    that made it); origin(index) gives it back for any clause of the batch.
+    """
+
+    def __init__(self, clauses=(), origin=None):
+        self.literals = array('i')
+        self.ends = array('i')
+        self.nvars = 0
+        self.digest = None   # the Fingerprint of the first hashed clauses
+        self.hashed = 0
+        self.starts = []     # first clause index of each tagged batch ...
+        self.origins = []    # ... and its origin
+        self.extend(clauses, origin)
+
+    def extend(self, clauses, origin=None):
+        "Append a batch of clauses (a list of lists, CNFArray or CNFView)"
+        if isinstance(clauses, CNFView) and origin is None:
+            # part by part, so whole CNFArray parts keep their origins
+            for part, length in clauses.parts:
+                self.extend(part if isinstance(part, CNFArray) and length == len(part) else part[:length])
+            return self
+        literals, ends = self.literals, self.ends
+        mark, count = len(literals), len(ends)
+        if isinstance(clauses, CNFArray):
+            literals.extend(clauses.literals)
+            ends.extend(array('i', [end + mark for end in clauses.ends]))
+        else:
+            try:
+                for clause in clauses:
+                    if isinstance(clause, (list, tuple)):
+                        literals.extend(clause)
+                    elif isinstance(clause, array):
+                        literals.extend(clause.tolist())
+                    else:
+                        raise TypeError
+                    if len(literals) == (ends[-1] if ends else 0):
+                        raise TypeError
+                    ends.append(len(literals))
+            except (TypeError, OverflowError):
+                del literals[mark:]
+                del ends[count:]
+                raise ValueError("the knowledge base is not in a valid CNF form")
+            if 0 in literals[mark:]:
+                del literals[mark:]
+                del ends[count:]
+                raise ValueError("the knowledge base is not in a valid CNF form")
+        if len(literals) > mark:
+            added = literals[mark:]
+            self.nvars = max(self.nvars, max(added), -min(added))
+
+        if origin is None and isinstance(clauses, CNFArray) and clauses.origins:
+            # keep the origins the added clauses already carry
+            if clauses.starts[0] > 0:
+                self.starts.append(count)
+                self.origins.append(None)
+            self.starts.extend(start + count for start in clauses.starts)
+            self.origins.extend(clauses.origins)
+        elif origin is not None or self.origins:
+            self.starts.append(count)
+            self.origins.append(origin)
+        return self
+
+    def append(self, clause, origin=None):
+        return self.extend([clause], origin)
+
+    def origin(self, index):
+        "The origin the clause at index was added with, or None"
+        batch = bisect.bisect_right(self.starts, index) - 1
+        return self.origins[batch] if batch >= 0 else None
+
+    def fingerprint(self):
+        "The Fingerprint of the clauses, brought up to date with those added since the last call"
+        if self.digest is None:
+            self.digest = Fingerprint()
+        if self.hashed < len(self):
+            self.digest.add(self[self.hashed:])
+            self.hashed = len(self)
+        return self.digest
+
+    def __getstate__(self):
+        # worker processes get the clauses without the Fingerprint
+        state = dict(self.__dict__)
+        state['digest'], state['hashed'] = None, 0
+        return state
+
+    def __len__(self):
+        return len(self.ends)
+
+    def clause(self, index):
+        return self.literals[self.ends[index - 1] if index > 0 else 0:self.ends[index]].tolist()
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self.clause(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError('clause index out of range')
+        return self.clause(index)
+
+    def __iter__(self):
+        literals, start = self.literals, 0
+        for end in self.ends:
+            yield literals[start:end].tolist()
+            start = end
+
+    def __add__(self, other):
+        return CNFView([self]) + other
+
+    def __iadd__(self, other):
+        return self.extend(other)
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __repr__(self):
+        return 'CNFArray(%r)' % list(self)
+
+    def stats(self):
+        "Size statistics: clauses, literals, variables and widest clause"
+        widths = [b - a for a, b in zip(array('i', [0]) + self.ends, self.ends)]
+        return {'clauses': len(self.ends), 'literals': len(self.literals),
+                'variables': self.nvars, 'max_width': max(widths or [0])}
+
+class CNFView:
+    """
+    Read-only concatenation of knowledge bases, e.g. "kb plus one extra
+    clause", without copying any of them.  A CNFArray part is frozen at
+    the length it had when the view was made.
+    """
+
+    def __init__(self, parts):
+        self.parts = [(part, len(part)) for part in parts]
+
+    def __len__(self):
+        return sum(length for part, length in self.parts)
 
-    depth = lambda L: isinstance(L, (list, tuple)) and max(map(depth, L)) + 1
-    value = lambda L: all(map(value, L)) if isinstance(L, (list, tuple)) else isinstance(L, int)
-    if depth(kb) != 2 or not value(kb):
+    def __iter__(self):
+        for part, length in self.parts:
+            if isinstance(part, CNFArray):
+                for index in range(length):
+                    yield part.clause(index)
+            else:
+                for clause in part[:length]:
+                    yield clause
+
+    def __add__(self, other):
+        view = CNFView([])
+        view.parts = self.parts + [(other, len(other))]
+        return view
+
+def check_cnf(kb, extra=()):
+    """
+    Raise ValueError unless kb plus the extra clauses is a nonempty CNF
+    knowledge base, without putting the two together.  Either may be a
+    CNFArray (valid already), a CNFView or a list of lists of ints.
+    """
+    size = 0
+    for clauses in (kb, extra):
+        if isinstance(clauses, CNFArray):
+            size += len(clauses)
+        elif isinstance(clauses, CNFView):
+            size += len(clauses)
+            for part, length in clauses.parts:
+                if length and not isinstance(part, CNFArray):
+                    check_cnf(part)
+        elif isinstance(clauses, (list, tuple)):
+            size += len(clauses)
+            for clause in clauses:
+                if not isinstance(clause, (list, tuple)) or not clause:
+                    raise ValueError("the knowledge base is not in a valid CNF form")
+                for literal in clause:
+                    if not isinstance(literal, int):
+                        raise ValueError("the knowledge base is not in a valid CNF form")
+        else:
+            raise ValueError("the knowledge base is not in a valid CNF form")
+    if size == 0:
         raise ValueError("the knowledge base is not in a valid CNF form")
 
-    nvals = lambda L: max([max(l) for l in L])
+class SolverStats:
+    """
+    What one solver call cost.  The wall clock seconds are split into
+    serialize (DIMACS text or clauses handed to the solver), spawn (solver
+    process or instance started), solve and parse (answer read back).
+    variables/clauses/literals give the instance size; counters holds
+    what the backend reports (decisions, learned clauses, implications,
+    ...), for zchaff parsed from the statistics it prints.
+    """
+
+    def __init__(self, backend):
+        self.backend = backend
+        self.result = None
+        self.variables = self.clauses = self.literals = 0
+        self.serialize = self.spawn = self.solve = self.parse = 0.0
+        self.counters = {}
+
+    def size(self, kb):
+        "Record the size of kb"
+        if isinstance(kb, CNFArray):
+            self.variables, self.clauses, self.literals = kb.nvars, len(kb), len(kb.literals)
+            return
+        self.clauses = len(kb)
+        for clause in kb:
+            self.literals += len(clause)
+            self.variables = max(self.variables, max(clause), -min(clause))
+
+    def total(self):
+        return self.serialize + self.spawn + self.solve + self.parse
+
+    def metrics(self):
+        "{name: number} of everything recorded; times in milliseconds"
+        metrics = dict(('%s_ms' % name, 1000 * getattr(self, name))
+                       for name in ('serialize', 'spawn', 'solve', 'parse'))
+        metrics['total_ms'] = 1000 * self.total()
+        metrics.update(variables=self.variables, clauses=self.clauses, literals=self.literals)
+        metrics.update(self.counters)
+        return metrics
+
+    def __repr__(self):
+        return 'SolverStats(%s, result=%r, %s)' % (self.backend, self.result, ', '.join(
+            '%s=%s' % (name, round(value, 3)) for name, value in sorted(self.metrics().items())))
+
+# Functions called with the SolverStats of every solver call; see add_hook.
+HOOKS = []
+
+def add_hook(hook):
+    "Call hook(stats) after every solver call from now on"
+    HOOKS.append(hook)
+    return hook
+
+def remove_hook(hook):
+    HOOKS.remove(hook)
+
+def report(stats):
+    for hook in list(HOOKS):
+        hook(stats)
+
+class StatsAggregator:
+    """
+    A hook that keeps every metric of every SolverStats it is given, per
+    backend, and prints a summary with a power-of-two histogram of each.
+    """
+
+    def __init__(self):
+        self.values = collections.defaultdict(list)   # (backend, metric) -> values
+        self.calls = collections.Counter()
 
-    out = tempfile.NamedTemporaryFile(mode='w')
-    print('c This DIMACS format CNF file was generated by cnf.py', file=out)
-    print('c DO NOT EDIT', file=out)
-    print('p cnf', nvals(kb), len(kb), file=out)
+    def __call__(self, stats):
+        self.calls[stats.backend] += 1
+        for name, value in stats.metrics().items():
+            self.values[stats.backend, name].append(value)
+
+    def histogram(self, values):
+        "[(low, high, count)] over power-of-two buckets; zeros get a bucket of their own"
+        buckets = collections.Counter()
+        for value in values:
+            buckets[None if value <= 0 else math.floor(math.log2(value))] += 1
+        rows = []
+        if None in buckets:
+            rows.append((0, 0, buckets.pop(None)))
+        for exponent in sorted(buckets):
+            rows.append((2.0 ** exponent, 2.0 ** (exponent + 1), buckets[exponent]))
+        return rows
+
+    def dump(self, out=None):
+        out = out or sys.stderr
+        for backend in sorted(self.calls):
+            print('%s: %d solver calls' % (backend, self.calls[backend]), file=out)
+            for (name_backend, name), values in sorted(self.values.items()):
+                if name_backend != backend:
+                    continue
+                ordered = sorted(values)
+                print('  %-16s mean %12.4g  p50 %12.4g  p90 %12.4g  max %12.4g' % (
+                    name, sum(values) / len(values), ordered[len(values) // 2],
+                    ordered[int(0.9 * (len(values) - 1))], ordered[-1]), file=out)
+                for low, high, count in self.histogram(values):
+                    bar = '#' * max(1, round(40 * count / len(values)))
+                    print('    %10.4g .. %-10.4g %7d %s' % (low, high, count, bar), file=out)
+
+    def save(self, path):
+        "dump to path, or to stderr for '-'"
+        if path == '-':
+            self.dump()
+        else:
+            with open(path, 'w') as out:
+                self.dump(out)
+
+def enable_stats(path='-'):
+    """
+    Collect the SolverStats of every solver call from now on and write
+    histograms of them when the interpreter exits, to path ('-' for
+    stderr, None to only collect).  Returns the StatsAggregator.
+    """
+    aggregator = add_hook(StatsAggregator())
+    if path is not None:
+        atexit.register(aggregator.save, path)
+    return aggregator
+
+def dimacs(kb, stats=None):
+    "The DIMACS text of kb as bytes; the p cnf header comes from the same single pass"
+    nvars = literals = 0
+    body = []
     for clause in kb:
-        for literal in clause:
-            print(literal, end=" ", file=out)
-        print('0', file=out)
-    out.flush()
+        body.append(' '.join(map(str, clause)))
+        nvars = max(nvars, max(clause), -min(clause))
+        literals += len(clause)
+    if stats is not None:
+        stats.variables, stats.clauses, stats.literals = nvars, len(kb), literals
+    return ('c This DIMACS format CNF file was generated by cnf.py\n'
+            'c DO NOT EDIT\n'
+            'p cnf %d %d\n%s 0\n' % (nvars, len(kb), ' 0\n'.join(body))).encode()
+
+def zchaff_output(kb, stats=None, race=None):
+    """
+    Run the ./zchaff executable on kb and return what it prints.  The
+    DIMACS text is piped to the solver as /dev/stdin; only systems
+    without /dev/stdin fall back to a temporary file.  Timings go into
+    stats if given.  Cancelling race kills the solver (Cancelled is raised).
+    """
+    if not os.path.exists('./zchaff'):
+        raise RuntimeError('could not locate zchaff executable')
+
+    stats = stats or SolverStats('zchaff')
+    start = time.perf_counter()
+    payload = dimacs(kb, stats)
+    spool = None
+    if os.path.exists('/dev/stdin'):
+        args = ['./zchaff', '/dev/stdin']
+    else:
+        spool = tempfile.NamedTemporaryFile()
+        spool.write(payload)
+        spool.flush()
+        args, payload = ['./zchaff', spool.name], b''
+    stats.serialize = time.perf_counter() - start
+
+    try:
+        start = time.perf_counter()
+        process = subprocess.Popen(args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        stats.spawn = time.perf_counter() - start
+        if race is not None:
+            race.on_cancel(process.kill)
+        start = time.perf_counter()
+        output, _ = process.communicate(payload)
+        stats.solve = time.perf_counter() - start
+    finally:
+        if spool is not None:
+            spool.close()
+    if race is not None and race.cancelled():
+        raise Cancelled('zchaff was stopped')
+    return output
+
+class SolverTimeout(RuntimeError):
+    "The solver ran out of time before it could decide the instance"
 
-    process = subprocess.Popen('./zchaff %s' % out.name, stdout=subprocess.PIPE, shell=True)
-    process.wait()
-    result = process.stdout.read()
-    process.stdout.close()
-    out.close()
+class Cancelled(RuntimeError):
+    "The solver was stopped because another one answered first"
 
+class Race:
+    """
+    What the backends of one portfolio call share: once the first answer
+    is in, cancel() tells the others to stop.  A backend either polls
+    cancelled() or registers a function with on_cancel that stops it.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.done = False
+        self.callbacks = []
+
+    def cancelled(self):
+        return self.done
+
+    def on_cancel(self, callback):
+        "Call callback when the race is cancelled (at once if it already is)"
+        with self.lock:
+            if not self.done:
+                self.callbacks.append(callback)
+                return
+        callback()
+
+    def discard(self, callback):
+        "Forget callback; once this returns it will not be called"
+        with self.lock:
+            if callback in self.callbacks:
+                self.callbacks.remove(callback)
+
+    def cancel(self):
+        with self.lock:
+            self.done = True
+            for callback in self.callbacks:
+                callback()
+            self.callbacks = []
+
+def zchaff_answer(result):
+    "True/False from the RESULT: line of zchaff's output"
     scan = iter(result.split())
     try:
         while scan.__next__() != b'RESULT:': pass
         answer = scan.__next__()
         if answer ==   b'SAT': return True
         if answer == b'UNSAT': return False
+        if b'TIME OUT' in result.split(b'RESULT:')[-1]:
+            raise SolverTimeout('zchaff reached its time limit')
         raise RuntimeError('neither SAT/UNSAT indicated')
     except StopIteration:
         raise RuntimeError('unexpected file end in generated DIMACS file')
 
-def entails(kb, literal):
-    return not satisfiable(kb + [[-literal]])
+# The statistics lines zchaff prints (handle_result in zChaff/sat_solver.cpp)
+ZCHAFF_COUNTERS = [
+    ('Num. of Decisions', 'decisions'),
+    ('Max Decision Level', 'max_level'),
+    ('Added Conflict Clauses', 'learned'),
+    ('Number of Implication', 'implications'),
+    ('Total Run Time', 'solver_time'),
+]
+
+def zchaff_counters(result):
+    "{name: number} from the statistics in zchaff's output"
+    counters = {}
+    for line in result.decode(errors='replace').splitlines():
+        for label, name in ZCHAFF_COUNTERS:
+            if line.startswith(label):
+                value = line[len(label):].split()
+                if value:
+                    counters[name] = float(value[0]) if name == 'solver_time' else int(value[0])
+    return counters
+
+def zchaff_model_of(result):
+    "The assignment zchaff prints after \"Instance Satisfiable\""
+    tokens = result.split(b'Instance Satisfiable', 1)[1].split(b'Random Seed Used', 1)[0].split()
+    return [int(token) for token in tokens]
+
+def zchaff_call(kb, want_model=False, race=None):
+    "(answer, model or None) from one run of the ./zchaff executable, reported to the hooks"
+    stats = SolverStats('zchaff')
+    result = zchaff_output(kb, stats, race)
+    start = time.perf_counter()
+    answer = zchaff_answer(result)
+    model = zchaff_model_of(result) if answer and want_model else None
+    stats.counters = zchaff_counters(result)
+    stats.parse = time.perf_counter() - start
+    stats.result = answer
+    report(stats)
+    return answer, model
+
+def zchaff_subprocess(kb):
+    "Run the ./zchaff executable on kb"
+    return zchaff_call(kb)[0]
+
+def zchaff_model(kb):
+    """
+    Run the ./zchaff executable on kb and read back the assignment it
+    prints; None if kb is unsatisfiable.
+    """
+    return zchaff_call(kb, True)[1]
+
+def zchaff_library_call(kb, want_model=False, race=None):
+    "(answer, model or None) from a fresh in-process zchaff manager, reported to the hooks"
+    import libzchaff
+    stats = SolverStats('libzchaff')
+    start = time.perf_counter()
+    with libzchaff.Manager() as manager:
+        stats.spawn = time.perf_counter() - start
+        start = time.perf_counter()
+        manager.add_clauses(kb)
+        stats.serialize = time.perf_counter() - start
+        start = time.perf_counter()
+        if race is not None:
+            race.on_cancel(manager.interrupt)
+        try:
+            result = manager.solve()
+        finally:
+            if race is not None:
+                race.discard(manager.interrupt)
+        stats.solve = time.perf_counter() - start
+        start = time.perf_counter()
+        model = manager.model() if result == libzchaff.SATISFIABLE and want_model else None
+        stats.counters = manager.counters()
+        stats.parse = time.perf_counter() - start
+    if race is not None and race.cancelled():
+        raise Cancelled('libzchaff was stopped')
+    if result not in (libzchaff.SATISFIABLE, libzchaff.UNSATISFIABLE):
+        raise RuntimeError('neither SAT/UNSAT indicated')
+    stats.size(kb)
+    stats.result = result == libzchaff.SATISFIABLE
+    report(stats)
+    return stats.result, model
+
+def cdcl_counters(solver, before=None):
+    "The counters of a cdcl.Solver, minus those in before"
+    counters = {'decisions': solver.decisions, 'conflicts': solver.conflicts, 'learned': solver.learned,
+                'implications': solver.propagations, 'restarts': solver.restarts}
+    if before:
+        counters = dict((name, value - before[name]) for name, value in counters.items())
+    return counters
+
+def python_cdcl_call(kb, want_model=False, race=None):
+    "(answer, model or None) from a fresh cdcl.Solver, reported to the hooks"
+    import cdcl
+    stats = SolverStats('cdcl')
+    start = time.perf_counter()
+    solver = cdcl.Solver(kb)
+    stats.serialize = time.perf_counter() - start
+    start = time.perf_counter()
+    if race is not None:
+        solver.stopped = race.cancelled
+    answer = solver.solve()
+    stats.solve = time.perf_counter() - start
+    if answer is None:
+        raise Cancelled('cdcl was stopped')
+    start = time.perf_counter()
+    model = solver.model() if answer and want_model else None
+    stats.counters = cdcl_counters(solver)
+    stats.parse = time.perf_counter() - start
+    stats.size(kb)
+    stats.result = answer
+    report(stats)
+    return answer, model
+
+def local_search_call(kb, want_model=False, race=None):
+    """
+    (answer, model or None) from walksat.Solver, reported to the hooks.
+    A model is only believed once it has been checked against kb.  When
+    LOCAL_SEARCH_FLIPS flips per variable find none, LOCAL_SEARCH_FALLBACK
+    decides kb instead; in a portfolio race the other backends are already doing
+    that, so SolverTimeout is raised there.
+    """
+    import random
+    import walksat
+    stats = SolverStats('walksat')
+    start = time.perf_counter()
+    rng = random.Random(LOCAL_SEARCH_SEED) if LOCAL_SEARCH_SEED is not None else None
+    solver = walksat.Solver(kb, rng)
+    stats.serialize = time.perf_counter() - start
+    start = time.perf_counter()
+    if race is not None:
+        solver.stopped = race.cancelled
+    budget = LOCAL_SEARCH_FLIPS * max(solver.nvars, 1)
+    answer = solver.solve(budget)
+    stats.solve = time.perf_counter() - start
+    if race is not None and race.cancelled():
+        raise Cancelled('walksat was stopped')
+    start = time.perf_counter()
+    model = solver.model() if answer else None
+    if model is not None and not walksat.satisfies(kb, model):
+        raise RuntimeError('local search returned an assignment that is not a model')
+    stats.counters = {'flips': solver.flips, 'false_clauses': len(solver.false)}
+    stats.parse = time.perf_counter() - start
+    stats.size(kb)
+    stats.result = answer
+    report(stats)
+    if answer is not None:
+        return answer, model if want_model else None
+    if race is not None:
+        raise SolverTimeout('walksat found no model in %d flips' % budget)
+    if want_model:
+        model = MODELS[LOCAL_SEARCH_FALLBACK](kb)
+        return model is not None, model
+    return BACKENDS[LOCAL_SEARCH_FALLBACK](kb), None
+
+def cube_and_conquer_call(kb, want_model=False, workers=None):
+    """
+    (answer, model or None) by cube-and-conquer, reported to the hooks.
+    cube.Cuber splits kb into cubes by lookahead, and the cubes go to a
+    pool of count_workers(workers) CUBE_BACKEND sessions: processes for
+    cdcl, threads otherwise, as for ParallelSession.  The first
+    satisfiable cube answers.  kb is unsatisfiable once every cube is.
+    Cubes still waiting are then cancelled; a cube a worker has already
+    started runs to its end, and its answer is thrown away.
+    """
+    import cube
+    workers = count_workers(workers)
+    depth = CUBE_DEPTH
+    if depth is None:
+        depth = max(1, math.ceil(math.log2(workers * CUBES_PER_WORKER)))
+    stats = SolverStats('cubes')
+    start = time.perf_counter()
+    clauses = list(kb)
+    cuber = cube.Cuber(clauses)
+    cubes = cuber.cubes(depth)
+    stats.serialize = time.perf_counter() - start
+    start = time.perf_counter()
+    model = None
+    if workers == 1 or len(cubes) <= 1:
+        with session(clauses, CUBE_BACKEND) as solver:
+            model = decide_cubes(solver, cubes)
+    else:
+        token = next(TOKENS)
+        pool = executor(CUBE_BACKEND, workers)
+        pending = set(pool.submit(worker_task, token, clauses, CUBE_BACKEND, 'cubes', ([literals],))
+                      for literals in cubes)
+        try:
+            while pending and model is None:
+                done, pending = concurrent.futures.wait(pending, return_when=concurrent.futures.FIRST_COMPLETED)
+                for future in done:
+                    if future.result() is not None:
+                        model = future.result()
+                        break
+        finally:
+            for future in pending:
+                future.cancel()
+    stats.solve = time.perf_counter() - start
+    stats.counters = {'cubes': len(cubes), 'lookaheads': cuber.lookaheads,
+                      'failed_literals': cuber.failed, 'refuted': cuber.refuted}
+    stats.size(kb)
+    stats.result = model is not None
+    report(stats)
+    return model is not None, model if want_model else None
+
+def zchaff_library(kb):
+    "Solve kb in this process through the zchaff C API (libsat.so)"
+    return zchaff_library_call(kb)[0]
+
+def python_cdcl(kb):
+    "Solve kb with the pure Python CDCL solver in cdcl.py"
+    return python_cdcl_call(kb)[0]
+
+def local_search(kb):
+    "Look for a model of kb by local search (walksat.py), falling back to a complete backend"
+    return local_search_call(kb)[0]
+
+def cube_and_conquer(kb):
+    "Solve kb by cube-and-conquer on WORKERS workers (see cube_and_conquer_call)"
+    return cube_and_conquer_call(kb)[0]
+
+def zchaff_library_model(kb):
+    return zchaff_library_call(kb, True)[1]
+
+def python_cdcl_model(kb):
+    return python_cdcl_call(kb, True)[1]
+
+def local_search_model(kb):
+    return local_search_call(kb, True)[1]
+
+def cube_and_conquer_model(kb):
+    return cube_and_conquer_call(kb, True)[1]
+
+# The backends the portfolio backend runs side by side
+PORTFOLIO = ['zchaff', 'libzchaff', 'cdcl', 'walksat']
+
+# (answer, model) functions that stop when their race is cancelled; other
+# backends run to the end
+RACERS = {
+    'zchaff': zchaff_call,
+    'libzchaff': zchaff_library_call,
+    'cdcl': python_cdcl_call,
+    'walksat': local_search_call,
+}
+
+# instance class (see instance_class) -> Counter of the backends that won portfolio races
+WINS = collections.defaultdict(collections.Counter)
+
+def instance_class(kb):
+    "The size class of kb: 'v<variables>/c<clauses>', both rounded up to a power of two"
+    nvars = kb.nvars if isinstance(kb, CNFArray) else max([abs(literal) for clause in kb for literal in clause] or [0])
+    return 'v%d/c%d' % (1 << max(nvars - 1, 0).bit_length(), 1 << max(len(kb) - 1, 0).bit_length())
+
+def portfolio_call(kb, want_model=False, backends=None):
+    """
+    Run the PORTFOLIO backends (or backends) on kb at the same time, each
+    in a thread of its own, and return (answer, model or None) from the
+    first one to finish.  The rest are cancelled: the zchaff process is
+    killed, libzchaff is interrupted, cdcl gives up at its next conflict
+    and walksat within 256 flips.  Only cdcl and walksat need the GIL
+    while they search.  A backend that fails (no executable, no libsat.so,
+    a time limit, local search without a model) drops out of the race;
+    only when all of them fail is the first error raised.  The winner is counted in WINS under
+    the instance class of kb, which is what best_backend goes by.
+    """
+    backends = PORTFOLIO if backends is None else backends
+    race = Race()
+    results = queue.Queue()
+
+    def run(backend):
+        try:
+            if backend in RACERS:
+                answer = RACERS[backend](kb, want_model, race)
+            elif want_model:
+                model = MODELS[backend](kb)
+                answer = (model is not None, model)
+            else:
+                answer = (BACKENDS[backend](kb), None)
+            results.put((backend, answer, None))
+        except Exception as error:
+            results.put((backend, None, error))
+
+    for backend in backends:
+        threading.Thread(target=run, args=(backend,), daemon=True).start()
+    errors = []
+    for _ in backends:
+        backend, answer, error = results.get()
+        if error is None:
+            race.cancel()
+            WINS[instance_class(kb)][backend] += 1
+            return answer
+        errors.append(error)
+    raise errors[0] if errors else ValueError('the portfolio has no backends')
+
+def portfolio(kb):
+    "Race the PORTFOLIO backends on kb (see portfolio_call)"
+    return portfolio_call(kb)[0]
+
+def portfolio_model(kb):
+    return portfolio_call(kb, True)[1]
+
+def best_backend(kb, default=None):
+    "The backend that has won the most portfolio races on instances of kb's class, else default"
+    wins = WINS.get(instance_class(kb))
+    return wins.most_common(1)[0][0] if wins else default
+
+def dump_wins(out=None):
+    "Print the portfolio winners per instance class"
+    out = out or sys.stdout
+    for name in sorted(WINS, key=lambda name: [int(part[1:]) for part in name.split('/')]):
+        wins = WINS[name]
+        out.write('%-16s %s\n' % (name, '  '.join('%s %d' % item for item in wins.most_common())))
+
+BACKENDS = {
+    'zchaff': zchaff_subprocess,
+    'libzchaff': zchaff_library,
+    'cdcl': python_cdcl,
+    'walksat': local_search,
+    'cubes': cube_and_conquer,
+    'portfolio': portfolio,
+}
+
+# Backends that can also return the model they found (a list of literals, or None)
+MODELS = {
+    'zchaff': zchaff_model,
+    'libzchaff': zchaff_library_model,
+    'cdcl': python_cdcl_model,
+    'walksat': local_search_model,
+    'cubes': cube_and_conquer_model,
+    'portfolio': portfolio_model,
+}
+
+def set_backend(name):
+    "Select the engine used by satisfiable/entails from now on"
+    global BACKEND
+    if name not in BACKENDS:
+        raise ValueError('unknown SAT backend %r (choose from %s)' % (name, ', '.join(sorted(BACKENDS))))
+    BACKEND = name
+
+def normalize(kb):
+    "Canonical form of kb: literals sorted, clauses deduplicated and sorted"
+    return sorted(set(tuple(sorted(set(clause))) for clause in kb))
+
+def fingerprint(kb):
+    """
+    A stable hash of the normalized kb, the same for every ordering of it.
+    A CNFArray keeps its Fingerprint and only hashes the clauses added
+    since, and so does a CNFView that starts with a whole CNFArray (a
+    session's kb plus its assumptions).
+    """
+    if isinstance(kb, CNFArray):
+        return kb.fingerprint().hexdigest()
+    if isinstance(kb, CNFView) and kb.parts and isinstance(kb.parts[0][0], CNFArray):
+        first, length = kb.parts[0]
+        if length == len(first):
+            return first.fingerprint().plus(clause for part, length in kb.parts[1:] for clause in part[:length])
+    return Fingerprint(kb).hexdigest()
+
+class Fingerprint:
+    """
+    The fingerprint of a knowledge base that grows: the sum of a hash of
+    each distinct normalized clause, so that adding clauses only hashes
+    those and the order of the clauses does not matter
+    """
+
+    def __init__(self, kb=()):
+        self.seen = set()
+        self.total = 0
+        self.add(kb)
+
+    def terms(self, kb, seen):
+        "The hashes of the clauses of kb in neither self.seen nor seen, which are added to seen"
+        for clause in kb:
+            clause = tuple(sorted(set(clause)))
+            if clause not in self.seen and clause not in seen:
+                seen.add(clause)
+                yield int.from_bytes(hashlib.sha1(repr(clause).encode()).digest(), 'big')
+
+    def add(self, kb):
+        self.total += sum(self.terms(kb, self.seen))
+
+    def plus(self, kb):
+        "hexdigest for these clauses and kb, without keeping kb"
+        return '%040x' % ((self.total + sum(self.terms(kb, set()))) % 2 ** 160)
+
+    def hexdigest(self):
+        return '%040x' % (self.total % 2 ** 160)
+
+class ResultCache:
+    """
+    Bounded LRU map from (kb fingerprint, query) to the answer.  With a
+    path the entries are loaded from that file when the cache is made
+    and written back by save().
+    """
+
+    def __init__(self, maxsize=1024, path=None):
+        self.maxsize = maxsize
+        self.path = path
+        self.entries = collections.OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        if path is not None and os.path.exists(path):
+            with open(path, 'rb') as handle:
+                self.entries.update(pickle.load(handle))
+            self.trim()
+
+    def __len__(self):
+        return len(self.entries)
+
+    def trim(self):
+        while len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+
+    def lookup(self, key, compute):
+        "The cached answer for key, calling compute() to fill in a miss"
+        found, value = self.get(key)
+        if not found:
+            value = compute()
+            self.store(key, value)
+        return value
+
+    def get(self, key):
+        "(True, answer) if key is cached, otherwise (False, None)"
+        if key in self.entries:
+            self.hits += 1
+            self.entries.move_to_end(key)
+            return True, self.entries[key]
+        self.misses += 1
+        return False, None
+
+    def store(self, key, value):
+        self.entries[key] = value
+        self.trim()
+
+    def clear(self):
+        self.entries.clear()
+        self.hits = self.misses = 0
+
+    def save(self):
+        if self.path is not None:
+            with open(self.path, 'wb') as handle:
+                pickle.dump(list(self.entries.items()), handle)
+
+    def info(self):
+        return {'hits': self.hits, 'misses': self.misses, 'size': len(self.entries), 'maxsize': self.maxsize}
+
+# The active ResultCache, or None (the default) to always run the solver.
+CACHE = None
+
+def enable_cache(maxsize=1024, path=None):
+    "Memoize satisfiable/entails/backbone answers; path makes them persist"
+    global CACHE
+    CACHE = ResultCache(maxsize, path)
+    if path is not None:
+        atexit.register(CACHE.save)
+    return CACHE
+
+def disable_cache():
+    global CACHE
+    CACHE = None
+
+def cached(kb, query, compute):
+    if CACHE is None:
+        return compute()
+    return CACHE.lookup((fingerprint(kb), query), compute)
+
+def joined(kb, extra):
+    "kb plus the extra clauses as a CNFView, so a plain list kb is not copied either"
+    return kb + extra if isinstance(kb, (CNFArray, CNFView)) else CNFView([kb, extra])
+
+# Preprocessors of the knowledge bases seen with PREPROCESS set, by
+# fingerprint, so a knowledge base that is queried again is not
+# simplified again; see preprocessed().
+SIMPLIFIED = collections.OrderedDict()
+SIMPLIFIED_SIZE = 16
+
+def preprocessed(kb, extra=()):
+    """
+    (Preprocessor, simplified clauses) for kb, with the variables of the
+    extra clauses frozen.  The result is kept in SIMPLIFIED; kb is only
+    simplified again if a later query mentions a variable that the kept
+    run eliminated.  That run freezes every variable eliminated before
+    as well, since the next queries tend to ask about their neighbours.
+    """
+    import preprocess
+    key = fingerprint(kb)
+    variables = set(abs(literal) for clause in extra for literal in clause)
+    entry = SIMPLIFIED.get(key)
+    if entry is not None:
+        SIMPLIFIED.move_to_end(key)
+        eliminated = set(var for var, clauses in entry[0].stack)
+        if not variables & eliminated:
+            return entry
+        variables |= entry[0].frozen | eliminated
+    simplified = preprocess.simplify(kb, frozen=variables)
+    entry = SIMPLIFIED[key] = (simplified, simplified.kb())
+    while len(SIMPLIFIED) > SIMPLIFIED_SIZE:
+        SIMPLIFIED.popitem(last=False)
+    return entry
+
+def simplified_query(kb, extra):
+    """
+    The clauses to hand the backend for kb plus extra, and the
+    Preprocessor; the clauses are None if the query is unsatisfiable
+    """
+    simplified, clauses = preprocessed(kb, extra)
+    if simplified.unsat:
+        return simplified, None
+    # facts found at the top level are dropped from the simplified
+    # clauses unless frozen, so apply them to the extra clauses here
+    true = simplified.true
+    query = []
+    for clause in extra:
+        if not any(literal in true for literal in clause):
+            clause = [literal for literal in clause if -literal not in true]
+            if not clause:
+                return simplified, None
+            query.append(clause)
+    return simplified, clauses + query
+
+def run_backend(kb, backend=None, extra=()):
+    """
+    Hand a validated kb plus the extra clauses to the backend.  If
+    PREPROCESS is set, kb is simplified first (once, see preprocessed) and
+    the extra clauses are added to the result.
+    """
+    if PREPROCESS:
+        simplified, kb = simplified_query(kb, extra)
+        if kb is None:
+            return False
+        if not kb:
+            return True
+    elif extra:
+        kb = joined(kb, list(extra))
+    return BACKENDS[backend or BACKEND](kb)
+
+def run_model_backend(kb, backend=None, extra=()):
+    "Like run_backend, but returns a model of kb plus extra, or None"
+    backend = backend or BACKEND
+    if backend not in MODELS:
+        raise ValueError('SAT backend %r does not report models' % backend)
+    if not PREPROCESS:
+        return MODELS[backend](joined(kb, list(extra)) if extra else kb)
+    simplified, reduced = simplified_query(kb, extra)
+    if reduced is None:
+        return None
+    model = MODELS[backend](reduced) if reduced else []
+    if model is None:
+        return None
+    model = simplified.extend_model(model)
+    assigned = set(abs(literal) for literal in model)
+    missing = set(abs(literal) for clause in extra for literal in clause) - assigned
+    return sorted(model + [-var for var in missing], key=abs)
+
+def solve(kb, backend=None):
+    """
+    A model of kb as a list of literals (one per variable, ordered by
+    variable), or None if kb is unsatisfiable
+    """
+    check_cnf(kb)
+    model = cached(kb, ('solve',), lambda: run_model_backend(kb, backend))
+    return None if model is None else sorted(model, key=abs)
+
+def satisfiable(kb, backend=None):
+    check_cnf(kb)
+    return cached(kb, ('satisfiable',), lambda: run_backend(kb, backend))
+
+def entails(kb, literal, backend=None):
+    check_cnf(kb, [[-literal]])
+    return cached(kb, ('entails', literal), lambda: not run_backend(kb, backend, [[-literal]]))
+
+# Most zchaff processes that satisfiable_async/entails_async run at once (per event loop).
+MAX_PROCESSES = 16
+
+process_limits = weakref.WeakKeyDictionary()
+
+def process_limit():
+    "The semaphore bounding the zchaff processes of the running event loop"
+    loop = asyncio.get_running_loop()
+    if loop not in process_limits:
+        process_limits[loop] = asyncio.Semaphore(MAX_PROCESSES)
+    return process_limits[loop]
+
+async def zchaff_output_async(kb, timeout=None, stats=None):
+    """
+    zchaff_output for asyncio: the solver runs as a child process while
+    the event loop carries on.  At most MAX_PROCESSES of them run at a
+    time.  timeout (seconds) becomes zchaff's own time limit, rounded up
+    to whole seconds, and is also enforced on the wall clock: a solver
+    still running then is killed and SolverTimeout raised.  Cancelling
+    the calling task kills the solver too.
+    """
+    if not os.path.exists('./zchaff'):
+        raise RuntimeError('could not locate zchaff executable')
+
+    stats = stats or SolverStats('zchaff')
+    start = time.perf_counter()
+    payload = dimacs(kb, stats)
+    spool = None
+    if os.path.exists('/dev/stdin'):
+        args = ['./zchaff', '/dev/stdin']
+    else:
+        spool = tempfile.NamedTemporaryFile()
+        spool.write(payload)
+        spool.flush()
+        args, payload = ['./zchaff', spool.name], b''
+    if timeout is not None:
+        args.append(str(max(1, math.ceil(timeout))))
+    stats.serialize = time.perf_counter() - start
+
+    async with process_limit():
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(*args, stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        stats.spawn = time.perf_counter() - start
+        try:
+            start = time.perf_counter()
+            output, _ = await asyncio.wait_for(process.communicate(payload), timeout)
+            stats.solve = time.perf_counter() - start
+        except asyncio.TimeoutError:
+            raise SolverTimeout('zchaff did not finish within %s seconds' % timeout)
+        finally:
+            if process.returncode is None:
+                process.kill()
+                await process.wait()
+            if spool is not None:
+                spool.close()
+    return output
+
+async def zchaff_call_async(kb, timeout=None):
+    "zchaff_call for asyncio; returns the answer"
+    stats = SolverStats('zchaff')
+    result = await zchaff_output_async(kb, timeout, stats)
+    start = time.perf_counter()
+    answer = zchaff_answer(result)
+    stats.counters = zchaff_counters(result)
+    stats.parse = time.perf_counter() - start
+    stats.result = answer
+    report(stats)
+    return answer
+
+async def cached_async(kb, query, compute):
+    "cached for coroutines: compute() is awaited on a miss"
+    if CACHE is None:
+        return await compute()
+    key = (fingerprint(kb), query)
+    found, value = CACHE.get(key)
+    if not found:
+        value = await compute()
+        CACHE.store(key, value)
+    return value
+
+async def satisfiable_async(kb, timeout=None):
+    """
+    satisfiable for asyncio, always on the zchaff executable (see
+    zchaff_output_async for the limits, timeout and cancellation)
+    """
+    check_cnf(kb)
+    return await cached_async(kb, ('satisfiable',), lambda: zchaff_call_async(kb, timeout))
+
+async def entails_async(kb, literal, timeout=None):
+    query = kb + [[-literal]]
+    check_cnf(query)
+    async def compute():
+        return not await zchaff_call_async(query, timeout)
+    return await cached_async(kb, ('entails', literal), compute)
+
+class Session:
+    """
+    A knowledge base that is loaded once and then queried many times.
+    This generic version keeps the clauses and hands kb + assumptions to
+    the backend on every query; backends that can solve incrementally
+    register a subclass in SESSIONS.
+    """
+
+    def __init__(self, kb=(), backend=None):
+        self.backend = backend or BACKEND
+        self.kb = CNFArray()
+        self.model = None
+        self.add(kb)
+
+    def add(self, kb):
+        "Add clauses permanently"
+        self.kb.extend(kb)
+
+    def satisfiable(self, assumptions=(), clauses=()):
+        """
+        Is kb plus the given literals (as unit clauses) and the given extra
+        clauses satisfiable?  Neither is kept for later queries.  If the
+        backend reports the satisfying assignment it is left in self.model
+        as a list of literals, otherwise self.model is None.
+        """
+        extra = [[literal] for literal in assumptions] + list(clauses)
+        check_cnf(self.kb, extra)
+        query = self.kb + extra
+        if self.backend in MODELS:
+            model = cached(query, ('solve',), lambda: run_model_backend(self.kb, self.backend, extra))
+            self.model = None if model is None else sorted(model, key=abs)
+            return self.model is not None
+        self.model = None
+        return cached(query, ('satisfiable',), lambda: run_backend(self.kb, self.backend, extra))
+
+    def entails(self, literal):
+        return not self.satisfiable([-literal])
+
+    def close(self):
+        pass
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+class ZchaffSession(Session):
+    """
+    Session on one in-process zchaff manager.  The knowledge base lives in
+    the permanent clause group 0; each query puts its assumptions in a
+    clause group of its own and deletes that group afterwards, so only
+    the learned clauses that depend on the assumptions are thrown away.
+    """
+
+    def __init__(self, kb=(), backend=None):
+        import libzchaff
+        self.manager = libzchaff.Manager()
+        Session.__init__(self, kb, backend)
+
+    def add(self, kb):
+        mark = len(self.kb)
+        Session.add(self, kb)
+        self.manager.add_clauses(self.kb[mark:])
+
+    def satisfiable(self, assumptions=(), clauses=()):
+        import libzchaff
+        self.model = None
+        stats = SolverStats('libzchaff')
+        start = time.perf_counter()
+        gid = None
+        extra = [[literal] for literal in assumptions] + list(clauses)
+        if extra:
+            check_cnf(extra)
+            gid = self.manager.alloc_group()
+            self.manager.add_clauses(extra, gid)
+        stats.serialize = time.perf_counter() - start
+        try:
+            start = time.perf_counter()
+            result = self.manager.solve()
+            stats.solve = time.perf_counter() - start
+            start = time.perf_counter()
+            if result == libzchaff.SATISFIABLE:
+                self.model = self.manager.model()
+            stats.counters = self.manager.counters()
+            # zchaff counts clauses added since the manager was made, query groups included
+            del stats.counters['learned']
+        finally:
+            if gid is not None:
+                self.manager.delete_group(gid)
+        stats.parse = time.perf_counter() - start
+        if result not in (libzchaff.SATISFIABLE, libzchaff.UNSATISFIABLE):
+            raise RuntimeError('neither SAT/UNSAT indicated')
+        stats.size(self.kb)
+        stats.clauses += len(extra)
+        stats.literals += sum(len(clause) for clause in extra)
+        stats.result = result == libzchaff.SATISFIABLE
+        report(stats)
+        return stats.result
+
+    def close(self):
+        self.manager.release()
+
+class CDCLSession(Session):
+    """
+    Session on one cdcl.Solver.  Assumptions are passed straight to the
+    solver.  Each batch of temporary clauses is guarded by a fresh
+    activation variable a: the clauses are added as (clause or -a), a is
+    assumed for the query, and the unit -a added afterwards switches them
+    off for good.  Learned clauses therefore never need to be discarded.
+    The solver numbers its variables in order of first use, so guards
+    never collide with a variable that a later clause mentions.
+    """
+
+    def __init__(self, kb=(), backend=None):
+        import cdcl
+        self.solver = cdcl.Solver()
+        self.inner = {}
+        self.outer = [None]
+        Session.__init__(self, kb, backend)
+
+    def variable(self, var):
+        "Solver variable standing for var, allocated on first use"
+        if var not in self.inner:
+            self.inner[var] = len(self.outer)
+            self.outer.append(var)
+        return self.inner[var]
+
+    def encode(self, clause):
+        return [self.variable(literal) if literal > 0 else -self.variable(-literal) for literal in clause]
+
+    def add(self, kb):
+        mark = len(self.kb)
+        Session.add(self, kb)
+        for clause in self.kb[mark:]:
+            self.solver.add_clause(self.encode(clause))
+
+    def satisfiable(self, assumptions=(), clauses=()):
+        self.model = None
+        stats = SolverStats('cdcl')
+        before = cdcl_counters(self.solver)
+        start = time.perf_counter()
+        assumptions = list(assumptions)
+        clauses = list(clauses)
+        inner = self.encode(assumptions)
+        if clauses:
+            check_cnf(clauses)
+            guard = len(self.outer)
+            self.outer.append(None)
+            for clause in clauses:
+                self.solver.add_clause(self.encode(clause) + [-guard])
+            inner.append(guard)
+        stats.serialize = time.perf_counter() - start
+        start = time.perf_counter()
+        result = self.solver.solve(inner)
+        stats.solve = time.perf_counter() - start
+        start = time.perf_counter()
+        if result:
+            outer = self.outer
+            self.model = [outer[abs(literal)] if literal > 0 else -outer[abs(literal)]
+                          for literal in self.solver.model() if outer[abs(literal)] is not None]
+        if clauses:
+            self.solver.add_clause([-guard])
+        stats.counters = cdcl_counters(self.solver, before)
+        stats.parse = time.perf_counter() - start
+        stats.size(self.kb)
+        stats.clauses += len(assumptions) + len(clauses)
+        stats.result = result
+        report(stats)
+        return result
+
+SESSIONS = {
+    'libzchaff': ZchaffSession,
+    'cdcl': CDCLSession,
+}
+
+def session(kb=(), backend=None):
+    "Open a Session on kb using the best session type for the backend"
+    backend = backend or BACKEND
+    return SESSIONS.get(backend, Session)(kb, backend)
+
+def iter_models(kb, project=None, limit=None, backend=None):
+    """
+    Generate the distinct models of kb (a clause list or a Session), each
+    a list of literals ordered by variable.  With project, a list of
+    variables, models are restricted to those variables and each
+    restriction is produced once.  At most limit models are generated.
+
+    One incremental session is opened for the whole enumeration; after
+    each model a clause blocking its (projected) literals is added to it.
+    """
+    clauses = kb.kb if isinstance(kb, Session) else kb
+    backend = kb.backend if isinstance(kb, Session) else backend
+    project = None if project is None else sorted(set(abs(var) for var in project))
+    count = 0
+    with session(clauses, backend) as solver:
+        if project:
+            # a variable missing from kb is free; the tautology makes sure the solver assigns it
+            mentioned = set(abs(literal) for clause in clauses for literal in clause)
+            solver.add([[var, -var] for var in project if var not in mentioned])
+        while limit is None or count < limit:
+            if not solver.satisfiable():
+                return
+            model = [literal for literal in solver.model
+                     if project is None or abs(literal) in project]
+            model.sort(key=abs)
+            yield model
+            count += 1
+            if not model:
+                return
+            solver.add([[-literal for literal in model]])
+
+def count_models(kb, project=None):
+    """
+    The number of models of kb (a clause list or a Session) over its own
+    variables, or with project the number of distinct assignments to
+    those variables that extend to a model (see sharpsat.py)
+    """
+    import sharpsat
+    clauses = kb.kb if isinstance(kb, Session) else kb
+    check_cnf(clauses)
+    key = ('count', None if project is None else tuple(sorted(set(project))))
+    return cached(clauses, key, lambda: sharpsat.ModelCounter().count(clauses, project))
+
+def marginals(kb, variables, project=None):
+    """
+    (total, {var: count}) where total is count_models(kb, project) and
+    count is the part of it in which var is true.  The counts share one
+    component cache, so the sub-problems common to all of them are only
+    counted once.
+    """
+    import sharpsat
+    clauses = kb.kb if isinstance(kb, Session) else kb
+    check_cnf(clauses)
+    variables = sorted(set(variables))
+
+    def compute():
+        counter = sharpsat.ModelCounter()
+        total = counter.count(clauses, project)
+        if total == 0:
+            return 0, dict((var, 0) for var in variables)
+        return total, dict((var, counter.count(clauses, project, [var])) for var in variables)
+    key = ('marginals', tuple(variables), None if project is None else tuple(sorted(set(project))))
+    return cached(clauses, key, compute)
+
+def sample_models(kb, project=None, limit=None, seed=None, budget=None):
+    """
+    Generate uniformly chosen models of kb (each a list of literals
+    ordered by variable, restricted to project if given), independently
+    and with repetition; at most limit of them.  Nothing is generated if
+    kb is unsatisfiable.  Sampling needs the exact count of kb first; with
+    budget, sharpsat.Timeout is raised if that takes more than budget
+    seconds.
+    """
+    import random
+    import sharpsat
+    clauses = kb.kb if isinstance(kb, Session) else kb
+    check_cnf(clauses)
+    counter = sharpsat.ModelCounter()
+    if budget is not None:
+        counter.deadline = time.perf_counter() + budget
+    models = counter.samples(clauses, project, random.Random(seed))
+    for model in models if limit is None else itertools.islice(models, limit):
+        counter.deadline = None
+        yield model
+
+def guess_models(kb, project=None, seed=None, backend=None):
+    """
+    Generate models of kb, restricted to project if given, without end
+    (nothing if kb is unsatisfiable).  Each comes from a session query
+    that assumes a random assignment of the variables, cut in half until
+    kb allows it.  The models come quickly but are not uniformly chosen,
+    and may repeat.
+    """
+    import random
+    rng = random.Random(seed)
+    clauses = kb.kb if isinstance(kb, Session) else kb
+    check_cnf(clauses)
+    if project is None:
+        variables = sorted(set(abs(literal) for clause in clauses for literal in clause))
+    else:
+        variables = sorted(set(abs(var) for var in project))
+    with session(clauses, backend) as solver:
+        if not solver.satisfiable():
+            return
+        while True:
+            cube = [var if rng.random() < 0.5 else -var for var in variables]
+            rng.shuffle(cube)
+            while not solver.satisfiable(cube):
+                cube = cube[:len(cube) // 2]
+            model = set(solver.model)
+            yield [var if var in model else -var for var in variables]
+
+def wilson(successes, n, z=1.96):
+    "The Wilson score interval of a proportion (95% for the default z)"
+    if n == 0:
+        return 0.0, 1.0
+    p = successes / n
+    denominator = 1 + z * z / n
+    centre = (p + z * z / (2 * n)) / denominator
+    half = z * math.sqrt(p * (1 - p) / n + z * z / (4 * n * n)) / denominator
+    return max(0.0, centre - half), min(1.0, centre + half)
+
+def tally(models, variables, deadline=None, uniform=True):
+    """
+    ({var: (p, low, high)}, number of models) for the share p of models
+    (lists of literals) in which each variable is true, taken until they
+    run out or, after the first, the deadline (a time.perf_counter()
+    value) passes.  low..high is a 95% Wilson interval if the models are
+    uniform samples and None otherwise.  (None, 0) if there are none.
+    """
+    counts = dict((var, 0) for var in variables)
+    n = 0
+    for model in models:
+        n += 1
+        for literal in model:
+            if literal > 0 and literal in counts:
+                counts[literal] += 1
+        if deadline is not None and time.perf_counter() >= deadline:
+            break
+    if n == 0:
+        return None, 0
+    if not uniform:
+        return dict((var, (counts[var] / n, None, None)) for var in counts), n
+    return dict((var, (counts[var] / n,) + wilson(counts[var], n)) for var in counts), n
+
+def estimate_marginals(kb, variables, samples=100, budget=None, seed=None):
+    """
+    Estimate from sample_models the probability that each variable is true
+    in a uniformly chosen model of kb.  Sampling stops after samples models
+    or, with budget, once budget seconds have passed (but not before the
+    first model).  Returns ({var: (p, low, high)}, number of samples,
+    uniform) with low..high a 95% Wilson interval, or (None, 0, uniform)
+    if kb is unsatisfiable.
+
+    With budget, the exact count that uniform sampling starts with may
+    take half of it.  If it does not finish in time, the models come from
+    guess_models instead: uniform is then False, and low and high are None
+    since those models are no uniform sample.
+    """
+    import sharpsat
+    variables = sorted(set(variables))
+    deadline = None if budget is None else time.perf_counter() + budget
+    models = sample_models(kb, variables, samples, seed, None if budget is None else budget / 2)
+    uniform = True
+    try:
+        first = next(models, None)
+    except sharpsat.Timeout:
+        models = itertools.islice(guess_models(kb, variables, seed), samples)
+        uniform = False
+        first = next(models, None)
+    if first is None:
+        return None, 0, uniform
+    return tally(itertools.chain([first], models), variables, deadline, uniform) + (uniform,)
+
+ENTAILED, REFUTED, UNKNOWN = 'entailed', 'refuted', 'unknown'
+
+def entails_many(kb, literals, backend=None, workers=None):
+    """
+    Decide a batch of literals against one knowledge base (a clause list
+    or an open Session).  Returns {literal: ENTAILED | REFUTED | UNKNOWN},
+    where REFUTED means kb entails the negation.  Every model the solver
+    hands back shows which way each literal can go, so a literal is only
+    queried for the polarity no model has exhibited yet.  With more than
+    one worker (or on a ParallelSession) the batch is split between them.
+    """
+    literals = list(literals)
+    clauses = kb.kb if isinstance(kb, Session) else kb
+
+    def compute():
+        if isinstance(kb, ParallelSession):
+            return kb.entails_many(literals)
+        if not isinstance(kb, Session) and count_workers(workers) > 1:
+            with ParallelSession(kb, backend, workers) as solver:
+                return solver.entails_many(literals)
+        solver = kb if isinstance(kb, Session) else session(kb, backend)
+        return decide_literals(solver, literals)
+    return dict(cached(clauses, ('entails_many', tuple(sorted(set(literals)))), compute))
+
+def decide_literals(solver, literals):
+    seen = set()   # literals true in at least one model
+
+    def observe():
+        if solver.model is not None:
+            seen.update(solver.model)
+
+    if not solver.satisfiable():
+        return dict((literal, ENTAILED) for literal in literals)
+    observe()
+
+    answers = {}
+    for literal in literals:
+        if literal in answers:
+            continue
+        if literal not in seen:
+            if not solver.satisfiable([literal]):
+                answers[literal] = REFUTED
+                continue
+            observe()
+        if -literal not in seen:
+            if not solver.satisfiable([-literal]):
+                answers[literal] = ENTAILED
+                continue
+            observe()
+        answers[literal] = UNKNOWN
+    return answers
+
+def propagate(kb, assumptions=()):
+    """
+    Unit propagation: the set of literals forced by the unit clauses of kb
+    (plus the assumptions), or None if propagation runs into a conflict.
+    Every literal returned is entailed by kb and the assumptions.
+    """
+    watches = {}
+    for clause in kb:
+        for literal in clause:
+            watches.setdefault(-literal, []).append(clause)
+
+    assigned = set()
+    queue = list(assumptions) + [clause[0] for clause in kb if len(set(clause)) == 1]
+    while queue:
+        literal = queue.pop()
+        if literal in assigned:
+            continue
+        if -literal in assigned:
+            return None
+        assigned.add(literal)
+        for clause in watches.get(literal, ()):
+            free = None
+            for other in clause:
+                if other in assigned:
+                    break
+                if -other not in assigned:
+                    if free is not None and free != other:
+                        break
+                    free = other
+            else:
+                if free is None:
+                    return None
+                queue.append(free)
+    return assigned
+
+def backbone(kb, variables=None, chunk=8, backend=None, workers=None):
+    """
+    The backbone of kb: every literal that is true in all of its models,
+    restricted to the given variables (default: all variables of kb).
+    Returns a set of literals, or None if kb is unsatisfiable.
+
+    Literals forced by unit propagation are accepted without a solver
+    call.  The remaining candidates are the literals of the first model;
+    they are tested a chunk at a time by asking for a model that falsifies
+    at least one of them.  UNSAT proves the whole chunk; a model instead
+    drops every candidate it falsifies, and the chunk is halved so that
+    a stubborn chunk ends up being tested literal by literal.  With more
+    than one worker (or on a ParallelSession) the variables are split
+    between them.
+    """
+    clauses = kb.kb if isinstance(kb, Session) else kb
+    if variables is None:
+        variables = set(abs(literal) for clause in clauses for literal in clause)
+    else:
+        variables = set(variables)
+
+    def compute():
+        if isinstance(kb, ParallelSession):
+            return kb.backbone(variables, chunk)
+        if not isinstance(kb, Session) and count_workers(workers) > 1:
+            with ParallelSession(kb, backend, workers) as solver:
+                return solver.backbone(variables, chunk)
+        if isinstance(kb, Session):
+            return compute_backbone(kb, variables, chunk)
+        with session(kb, backend) as solver:
+            return compute_backbone(solver, variables, chunk)
+    result = cached(clauses, ('backbone', tuple(sorted(variables))), compute)
+    return None if result is None else set(result)
+
+def decide_cubes(solver, cubes):
+    "The model of the first cube that is satisfiable on solver (a Session), or None"
+    for literals in cubes:
+        if solver.satisfiable(literals):
+            return solver.model
+    return None
+
+def compute_backbone(solver, variables, chunk):
+    if not solver.satisfiable():
+        return None
+    if solver.model is None:
+        answers = entails_many(solver, variables)
+        return frozenset([var for var in variables if answers[var] == ENTAILED] +
+                         [-var for var in variables if answers[var] == REFUTED])
+
+    variables = set(variables)
+    result = set(literal for literal in propagate(solver.kb) if abs(literal) in variables)
+    candidates = [literal for literal in solver.model if abs(literal) in variables and literal not in result]
+    size = chunk
+    while candidates:
+        batch = candidates[:size]
+        if not solver.satisfiable(clauses=[[-literal for literal in batch]]):
+            result.update(batch)
+            candidates = candidates[size:]
+            size = chunk
+        else:
+            model = set(solver.model)
+            candidates = [literal for literal in candidates if literal in model]
+            size = max(1, size // 2)
+    return frozenset(result)
+
+def explain(kb, literal):
+    """
+    Why kb entails literal: a minimal set of clauses of kb that is
+    unsatisfiable together with -literal, as (index, clause, origin)
+    triples in kb order.  origin is what the clause was added to a
+    CNFArray with (see CNFArray.origin), otherwise None.  Returns None if
+    kb does not entail literal.
+
+    Every clause is switched on by a selector variable, so one cdcl solve
+    with all selectors assumed yields a first core: the selectors its
+    refutation used.  The core is then shrunk by deletion.  Leaving one
+    clause out either makes the rest satisfiable, so the clause is needed,
+    or gives a refutation that uses even fewer clauses, and that smaller
+    core replaces the current one (clause-set refinement).  What remains
+    is a minimal unsatisfiable subset: no clause of it can be dropped.
+    """
+    import cdcl
+    source = kb.kb if isinstance(kb, Session) else kb
+    clauses = list(source)
+    check_cnf(clauses, [[-literal]])
+    base = max([abs(literal)] + [abs(other) for clause in clauses for other in clause])
+    solver = cdcl.Solver()
+    solver.add_clause([-literal])
+    for index, clause in enumerate(clauses):
+        solver.add_clause(list(clause) + [-(base + 1 + index)])
+    if solver.solve(range(base + 1, base + 1 + len(clauses))):
+        return None
+
+    core = sorted(selector - base - 1 for selector in solver.conflict)
+    needed = []
+    while core:
+        candidate = core.pop(0)
+        if solver.solve([base + 1 + index for index in needed + core]):
+            needed.append(candidate)
+        else:
+            used = set(solver.conflict)
+            core = [index for index in core if base + 1 + index in used]
+    needed.sort()
+    origin = source.origin if isinstance(source, CNFArray) else lambda index: None
+    return [(index, clauses[index], origin(index)) for index in needed]
+
+def count_workers(workers=None):
+    "The number of workers asked for (default WORKERS), with 0 meaning one per core"
+    workers = WORKERS if workers is None else workers
+    return workers if workers > 0 else os.cpu_count() or 1
+
+# Backends that hold the GIL while solving get processes, the others threads.
+PROCESS_BACKENDS = {'cdcl'}
+
+EXECUTORS = {}
+
+def executor(backend, workers):
+    "A shared pool of workers suited to the backend"
+    kind = 'process' if backend in PROCESS_BACKENDS else 'thread'
+    if (kind, workers) not in EXECUTORS:
+        if kind == 'process':
+            EXECUTORS[kind, workers] = concurrent.futures.ProcessPoolExecutor(workers)
+        else:
+            EXECUTORS[kind, workers] = concurrent.futures.ThreadPoolExecutor(workers)
+    return EXECUTORS[kind, workers]
+
+@atexit.register
+def shutdown_executors():
+    for pool in EXECUTORS.values():
+        pool.shutdown(cancel_futures=True)
+    EXECUTORS.clear()
+
+TOKENS = itertools.count()
+
+# Each worker thread (or process) keeps one session, rebuilt when the token changes.
+worker_state = threading.local()
+
+# The sessions worker threads keep, by token, so that the ParallelSession
+# they work for can close them (see close_worker_sessions).
+WORKER_SESSIONS = {}
+worker_lock = threading.Lock()
+
+def close_worker_sessions(token):
+    "Close the sessions this process's workers keep for token"
+    with worker_lock:
+        sessions = WORKER_SESSIONS.pop(token, [])
+    for solver in sessions:
+        solver.close()
+
+def worker_task(token, kb, backend, task, args):
+    "Run decide_literals, compute_backbone or decide_cubes on the calling worker's session"
+    if getattr(worker_state, 'token', None) != token:
+        old = getattr(worker_state, 'session', None)
+        if old is not None:
+            with worker_lock:
+                sessions = WORKER_SESSIONS.get(worker_state.token, [])
+                kept = old in sessions
+                if kept:
+                    sessions.remove(old)
+            # one its ParallelSession closed already is not closed again
+            if kept:
+                old.close()
+        worker_state.session = session(kb, backend)
+        worker_state.token = token
+        with worker_lock:
+            WORKER_SESSIONS.setdefault(token, []).append(worker_state.session)
+    if task == 'entails_many':
+        return decide_literals(worker_state.session, *args)
+    if task == 'cubes':
+        return decide_cubes(worker_state.session, *args)
+    return compute_backbone(worker_state.session, *args)
+
+class ParallelSession(Session):
+    """
+    A Session whose batch queries (entails_many, backbone) are split into
+    one slice per worker and run on a pool.  Backends that release the GIL
+    (libzchaff, the zchaff subprocess) run on threads, cdcl on processes.
+    Every worker keeps a session of its own on the knowledge base, so the
+    clauses are only loaded again after add; add and close close the
+    sessions of worker threads (a worker process drops its cdcl session
+    at its next task).  Results are merged in slice
+    order, so the answers do not depend on which worker finished first.
+    Single queries run on an ordinary session in the calling thread.
+    """
+
+    def __init__(self, kb=(), backend=None, workers=None):
+        self.workers = count_workers(workers)
+        self.local = None
+        self.token = next(TOKENS)
+        Session.__init__(self, kb, backend)
+
+    def add(self, kb):
+        mark = len(self.kb)
+        Session.add(self, kb)
+        if self.local is not None:
+            self.local.add(self.kb[mark:])
+        close_worker_sessions(self.token)
+        self.token = next(TOKENS)
+
+    def satisfiable(self, assumptions=(), clauses=()):
+        if self.local is None:
+            self.local = session(self.kb, self.backend)
+        result = self.local.satisfiable(assumptions, clauses)
+        self.model = self.local.model
+        return result
+
+    def map(self, task, items, *args):
+        "Run task on one slice of items per worker; the results in slice order"
+        items = sorted(items, key=abs)
+        slices = [items[i::self.workers] for i in range(min(self.workers, len(items)))]
+        if len(slices) <= 1:
+            return [worker_task(self.token, self.kb, self.backend, task, (items,) + args)]
+        pool = executor(self.backend, self.workers)
+        futures = [pool.submit(worker_task, self.token, self.kb, self.backend, task, (part,) + args)
+                   for part in slices]
+        return [future.result() for future in futures]
+
+    def entails_many(self, literals):
+        answers = {}
+        for part in self.map('entails_many', set(literals)):
+            answers.update(part)
+        return answers
+
+    def backbone(self, variables, chunk=8):
+        result = set()
+        for part in self.map('backbone', variables, chunk):
+            if part is None:
+                return None
+            result.update(part)
+        return frozenset(result)
+
+    def close(self):
+        if self.local is not None:
+            self.local.close()
+            self.local = None
+        close_worker_sessions(self.token)
+
+if os.environ.get('CNF_STATS'):
+    # CNF_STATS=<file> (or - for stderr) writes solver call histograms at exit
+    enable_stats(os.environ['CNF_STATS'])
+
+if os.environ.get('CNF_WORKERS'):
+    WORKERS = int(os.environ['CNF_WORKERS'])
+
+if os.environ.get('CNF_CACHE'):
+    # CNF_CACHE=<file> keeps answers between runs, CNF_CACHE=:memory: only within one
+    enable_cache(path=None if os.environ['CNF_CACHE'] == ':memory:' else os.environ['CNF_CACHE'])
@@ -0,0 +1,108 @@
+'''cube.py - splitting a knowledge base into cubes for cube-and-conquer.
+
+A cube is a conjunction of literals.  Splitting on a variable x gives the
+cubes x and -x, splitting each of those again gives four, and so on.  The
+cubes of a split cover every assignment, so kb is satisfiable exactly when
+kb plus one of its cubes is, and the cubes are independent problems that
+separate workers can solve at the same time (the 'cubes' backend of cnf).
+
+The variable to split on is chosen by lookahead, as in march: each
+candidate is assigned both ways in turn, unit propagation is run, and the
+variable whose two branches force the most literals (the product of the
+two counts) wins, since it leaves the smallest sub-problems behind.  A
+literal whose propagation fails is a failed literal.  Its negation holds
+under the cube so far and is added to the cube.  If both signs of a
+variable fail, the cube is refuted on the spot and dropped.
+
+Propagation is borrowed from cdcl.Solver: a lookahead is one decision
+level pushed on its trail and cancelled again.
+'''
+
+import collections
+
+import cdcl
+
+class Cuber:
+
+    candidates = 16     # variables looked ahead on per split, most frequent first
+
+    def __init__(self, kb):
+        self.solver = cdcl.Solver(kb)
+        self.occurs = collections.Counter(abs(literal) for clause in kb for literal in clause)
+        self.lookaheads = 0
+        self.failed = 0         # failed literals found
+        self.refuted = 0        # cubes dropped because propagation refuted them
+
+    def cubes(self, depth):
+        """
+        The cubes (lists of DIMACS literals) of a split at most depth
+        decisions deep; an empty list if kb is unsatisfiable
+        """
+        solver = self.solver
+        if not solver.ok or solver.propagate() >= 0:
+            return []
+        result = []
+        self.split([], depth, result)
+        return result
+
+    def look(self, code):
+        "The number of literals that literal code forces, or -1 if it fails"
+        solver = self.solver
+        mark = len(solver.trail)
+        solver.trail_lim.append(mark)
+        solver.enqueue(code, -1)
+        self.lookaheads += 1
+        forced = -1 if solver.propagate() >= 0 else len(solver.trail) - mark
+        solver.cancel_until(len(solver.trail_lim) - 1)
+        return forced
+
+    def choose(self):
+        """
+        (var, implied): the variable to split on next (0 once every
+        variable is assigned), or a literal code that is implied because
+        its negation failed
+        """
+        solver = self.solver
+        free = [var for var in range(1, solver.nvars + 1) if solver.value[2 * var] == cdcl.FREE and self.occurs[var]]
+        free.sort(key=lambda var: -self.occurs[var])
+        best, best_score = 0, -1
+        for var in free[:self.candidates]:
+            positive = self.look(2 * var)
+            if positive < 0:
+                return 0, 2 * var + 1
+            negative = self.look(2 * var + 1)
+            if negative < 0:
+                return 0, 2 * var
+            if positive * negative > best_score:
+                best, best_score = var, positive * negative
+        return best, None
+
+    def split(self, cube, depth, result):
+        solver = self.solver
+        var, implied = self.choose() if depth > 0 else (0, None)
+        while implied is not None:
+            self.failed += 1
+            solver.enqueue(implied, -1)
+            if solver.propagate() >= 0:
+                self.refuted += 1
+                return
+            if solver.trail_lim:
+                cube = cube + [solver.decode(implied)]
+            var, implied = self.choose()
+        if var == 0:
+            result.append(cube)
+            return
+
+        level = len(solver.trail_lim)
+        for code in (2 * var, 2 * var + 1):
+            solver.trail_lim.append(len(solver.trail))
+            solver.enqueue(code, -1)
+            if solver.propagate() >= 0:
+                self.refuted += 1
+            else:
+                self.split(cube + [solver.decode(code)], depth - 1, result)
+            solver.cancel_until(level)
+
+def cubes(kb, depth):
+    "The cubes of a lookahead split of kb, at most depth decisions deep"
+    return Cuber(kb).cubes(depth)
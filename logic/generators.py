@@ -0,0 +1,107 @@
+'''generators.py - knowledge bases to benchmark the SAT backends on.
+
+Every generator returns a plain list of DIMACS clauses and takes a seed
+where there is randomness, so the same arguments always give the same
+instance:
+
+  random_ksat      uniform random k-SAT; around 4.26 clauses per variable
+                   3-SAT is hardest (the phase transition)
+  pigeonhole       n + 1 pigeons in n holes, unsatisfiable and hard for
+                   every resolution based solver
+  scaled_cluedo    what one player knows in a Cluedo game of any size
+  random_game      the same for the game of any cluedo.GameSpec
+  liars_puzzle     a knights and knaves puzzle in the style of liars.py
+'''
+
+import random
+
+import cluedo
+
+def random_ksat(variables, ratio, k=3, seed=0):
+    "A random k-SAT instance with ratio * variables clauses of k distinct variables each"
+    rng = random.Random(seed)
+    return [[var if rng.random() < 0.5 else -var for var in rng.sample(range(1, variables + 1), k)]
+            for _ in range(int(round(ratio * variables)))]
+
+def pigeonhole(holes, pigeons=None):
+    """
+    pigeons (default holes + 1) pigeons, each in a hole, no two in the
+    same hole; variable i * holes + j + 1 is pigeon i in hole j
+    """
+    pigeons = holes + 1 if pigeons is None else pigeons
+    ident = lambda pigeon, hole: pigeon * holes + hole + 1
+    kb = [[ident(pigeon, hole) for hole in range(holes)] for pigeon in range(pigeons)]
+    for hole in range(holes):
+        kb.extend([-ident(pigeon, hole), -ident(other, hole)]
+                  for pigeon in range(pigeons) for other in range(pigeon + 1, pigeons))
+    return kb
+
+def scaled_cluedo(players=6, sizes=(6, 6, 9), turns=30, seed=0, encoding='pairwise'):
+    """
+    random_game for cluedo.GameSpec.generic(players, sizes): a game with
+    the given number of players and one category of cards per size
+    """
+    return random_game(cluedo.GameSpec.generic(players, sizes), turns, seed, encoding)
+
+def random_game(spec, turns=30, seed=0, encoding='pairwise', sizes=False):
+    """
+    What the first player in seating order knows in a game of shape spec
+    (a cluedo.GameSpec) after a random deal and turns random suggestions,
+    built with the functions of cluedo; the axioms use the given
+    cardinality encoding.  sizes adds the hand sizes the deal implies
+    (cluedo.axiom_hand_sizes, totalizer encoded).
+    """
+    rng = random.Random(seed)
+    pool = cluedo.auxiliary_pool(spec)
+    kb = []
+    for axiom in (cluedo.axiom_card_exists, cluedo.axiom_card_unique, cluedo.axiom_casefile_exists, cluedo.axiom_casefile_unique):
+        kb.extend(axiom(encoding, pool, spec))
+
+    me = spec.seating[0]
+    solution = [rng.choice(category) for category in spec.categories]
+    rest = [card for card in spec.cards if card not in solution]
+    rng.shuffle(rest)
+    owner = dict((card, spec.seating[position % len(spec.seating)]) for position, card in enumerate(rest))
+    owner.update((card, spec.casefile) for card in solution)
+    kb.extend(cluedo.deal(me, [card for card in spec.cards if owner[card] == me], spec))
+    kb.extend([-spec.identifier(me, card)] for card in spec.cards if owner[card] != me)
+    if sizes:
+        mine = [card for card in spec.cards if owner[card] == me]
+        kb.extend(cluedo.axiom_hand_sizes(cluedo.hand_sizes(me, mine, spec), 'totalizer', pool, spec))
+    for turn in range(turns):
+        suggester = spec.seating[turn % len(spec.seating)]
+        suggested = [rng.choice(category) for category in spec.categories]
+        refuter = shown = None
+        for player in spec.following(suggester):
+            held = [card for card in suggested if owner[card] == player]
+            if held:
+                refuter = player
+                if me in (suggester, player):
+                    shown = rng.choice(held)
+                break
+        kb.extend(cluedo.suggestion(suggester, suggested, refuter, shown, spec))
+    return kb
+
+def liars_puzzle(suspects=3, seed=0):
+    """
+    Like liars.py with any number of suspects: variable i (1..suspects)
+    is 'suspect i tells the truth' and suspects + i is 'suspect i is the
+    culprit'.  Exactly one suspect is the culprit, at least one lies and
+    at least one tells the truth, and each suspect makes one random
+    statement (someone is or is not the culprit, someone tells the truth
+    or lies), which is true exactly when its speaker tells the truth.
+    """
+    rng = random.Random(seed)
+    culprits = [suspects + i for i in range(1, suspects + 1)]
+    kb = [culprits[:]]
+    kb.extend([-culprit, -other] for culprit in culprits for other in culprits if culprit < other)
+    kb.append(list(range(1, suspects + 1)))
+    kb.append([-speaker for speaker in range(1, suspects + 1)])
+    for speaker in range(1, suspects + 1):
+        subject = rng.choice([other for other in range(1, suspects + 1) if other != speaker])
+        statement = rng.choice([subject, suspects + subject])
+        if rng.random() < 0.5:
+            statement = -statement
+        kb.append([-speaker, statement])
+        kb.append([speaker, -statement])
+    return kb
@@ -0,0 +1,208 @@
+'''libzchaff.py - an in-process ctypes binding to the zchaff C API.
+
+The functions bound here are the ones declared in zChaff/SAT_C.h.  The
+shared library is not part of the checkout; build it once with
+
+    make -C ../zChaff libsat.so
+
+ctypes drops the GIL for the duration of every foreign call, so a
+thread blocked in SAT_Solve does not stop the rest of the interpreter.
+'''
+
+import ctypes
+import os.path
+
+# enum SAT_StatusT
+UNDETERMINED, UNSATISFIABLE, SATISFIABLE, TIME_OUT, MEM_OUT, ABORTED = range(6)
+
+_lib = None
+
+def library_paths():
+    "Candidate locations of libsat.so, most specific first"
+    here = os.path.dirname(os.path.abspath(__file__))
+    paths = []
+    if os.environ.get('ZCHAFF_LIBRARY'):
+        paths.append(os.environ['ZCHAFF_LIBRARY'])
+    paths.append(os.path.join(os.getcwd(), 'libsat.so'))
+    paths.append(os.path.join(here, 'libsat.so'))
+    paths.append(os.path.join(here, '..', 'zChaff', 'libsat.so'))
+    return paths
+
+def load():
+    "Load libsat.so (once) and declare the signatures used by Manager"
+    global _lib
+    if _lib is not None:
+        return _lib
+    for path in library_paths():
+        if os.path.exists(path):
+            break
+    else:
+        raise RuntimeError('could not locate libsat.so (run "make libsat.so" in zChaff)')
+
+    lib = ctypes.CDLL(os.path.abspath(path))
+    mng = ctypes.c_void_p
+    signatures = {
+        'SAT_InitManager':        (mng, []),
+        'SAT_ReleaseManager':     (None, [mng]),
+        'SAT_SetNumVariables':    (None, [mng, ctypes.c_int]),
+        'SAT_AddVariable':        (ctypes.c_int, [mng]),
+        'SAT_NumVariables':       (ctypes.c_int, [mng]),
+        'SAT_AddClause':          (None, [mng, ctypes.POINTER(ctypes.c_int), ctypes.c_int, ctypes.c_int]),
+        'SAT_AllocClauseGroupID': (ctypes.c_int, [mng]),
+        'SAT_DeleteClauseGroup':  (None, [mng, ctypes.c_int]),
+        'SAT_Reset':              (None, [mng]),
+        'SAT_SetTimeLimit':       (None, [mng, ctypes.c_float]),
+        'SAT_Solve':              (ctypes.c_int, [mng]),
+        'SAT_GetVarAsgnment':     (ctypes.c_int, [mng, ctypes.c_int]),
+        'SAT_SetQuiet':           (None, [ctypes.c_int]),
+        'SAT_NumDecisions':       (ctypes.c_int, [mng]),
+        'SAT_MaxDLevel':          (ctypes.c_int, [mng]),
+        'SAT_NumAddedClauses':    (ctypes.c_int, [mng]),
+        'SAT_InitNumClauses':     (ctypes.c_int, [mng]),
+        'SAT_NumImplications':    (ctypes.c_longlong, [mng]),
+        'SAT_GetCPUTime':         (ctypes.c_float, [mng]),
+    }
+    for name, (restype, argtypes) in signatures.items():
+        function = getattr(lib, name)
+        function.restype = restype
+        function.argtypes = argtypes
+
+    lib.SAT_SetQuiet(1)
+    _lib = lib
+    return _lib
+
+def available():
+    "True if libsat.so can be loaded"
+    try:
+        load()
+        return True
+    except (RuntimeError, OSError):
+        return False
+
+def encode(clause):
+    """
+    Translate a DIMACS clause into zchaff's 2 * var + sign literals.
+    Repeated literals are merged; a clause containing both phases of a
+    variable is satisfied and comes back as None (zchaff requires
+    non-redundant clauses, and its DIMACS reader drops tautologies too).
+    """
+    lits = set(clause)
+    if any(-literal in lits for literal in lits):
+        return None
+    return sorted(2 * abs(literal) + (literal < 0) for literal in lits)
+
+class Manager:
+    "One zchaff solver instance (a SAT_Manager) living in this process"
+
+    def __init__(self):
+        self.lib = load()
+        self.mng = self.lib.SAT_InitManager()
+        self.nvars = 0
+        self.solved = False
+
+    def release(self):
+        if self.mng is not None:
+            self.lib.SAT_ReleaseManager(self.mng)
+            self.mng = None
+
+    def __del__(self):
+        if getattr(self, 'lib', None) is not None:
+            self.release()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.release()
+
+    def num_variables(self):
+        return self.lib.SAT_NumVariables(self.mng)
+
+    def reserve(self, nvars):
+        "Make sure variables 1..nvars exist"
+        if nvars <= self.nvars:
+            return
+        if self.nvars == 0:
+            self.lib.SAT_SetNumVariables(self.mng, nvars)
+        while self.num_variables() < nvars:
+            self.lib.SAT_AddVariable(self.mng)
+        self.nvars = nvars
+
+    def add_clause(self, clause, gid=0):
+        self.add_clauses([clause], gid)
+
+    def add_clauses(self, kb, gid=0):
+        if not kb:
+            return
+        self.reserve(max(abs(literal) for clause in kb for literal in clause))
+        add = self.lib.SAT_AddClause
+        for clause in kb:
+            lits = encode(clause)
+            if lits is not None:
+                add(self.mng, (ctypes.c_int * len(lits))(*lits), len(lits), gid)
+
+    def alloc_group(self):
+        gid = self.lib.SAT_AllocClauseGroupID(self.mng)
+        if gid < 0:
+            raise RuntimeError('zchaff has no free clause group left')
+        return gid
+
+    def delete_group(self, gid):
+        self.lib.SAT_DeleteClauseGroup(self.mng, gid)
+
+    def set_time_limit(self, seconds):
+        self.lib.SAT_SetTimeLimit(self.mng, seconds)
+
+    def interrupt(self):
+        "Make a solve running in another thread give up (it returns TIME_OUT)"
+        self.set_time_limit(-1.0)
+
+    def solve(self):
+        "Run the solver; returns one of the SAT_StatusT values"
+        if self.solved:
+            self.lib.SAT_Reset(self.mng)
+        self.solved = True
+        return self.lib.SAT_Solve(self.mng)
+
+    def value(self, var):
+        "1, 0, or -1 (unassigned) for var after a SATISFIABLE solve"
+        return self.lib.SAT_GetVarAsgnment(self.mng, var)
+
+    def model(self):
+        "The assignment after a SATISFIABLE solve, as a list of literals"
+        value = self.lib.SAT_GetVarAsgnment
+        model = []
+        for var in range(1, self.nvars + 1):
+            assigned = value(self.mng, var)
+            if assigned == 1: model.append(var)
+            elif assigned == 0: model.append(-var)
+        return model
+
+    def counters(self):
+        "The solver's statistics, under the names cnf.SolverStats uses"
+        lib, mng = self.lib, self.mng
+        return {
+            'decisions': lib.SAT_NumDecisions(mng),
+            'max_level': lib.SAT_MaxDLevel(mng),
+            'learned': lib.SAT_NumAddedClauses(mng) - lib.SAT_InitNumClauses(mng),
+            'implications': lib.SAT_NumImplications(mng),
+            'solver_time': lib.SAT_GetCPUTime(mng),
+        }
+
+def satisfiable(kb):
+    "Solve kb with a fresh in-process manager"
+    with Manager() as manager:
+        manager.add_clauses(kb)
+        result = manager.solve()
+    if result == SATISFIABLE: return True
+    if result == UNSATISFIABLE: return False
+    raise RuntimeError('neither SAT/UNSAT indicated')
+
+def solve(kb):
+    "A model of kb as a list of literals, or None if kb is unsatisfiable"
+    with Manager() as manager:
+        manager.add_clauses(kb)
+        result = manager.solve()
+        if result == SATISFIABLE: return manager.model()
+    if result == UNSATISFIABLE: return None
+    raise RuntimeError('neither SAT/UNSAT indicated')
@@ -75,8 +75,11 @@ class CNFTest(testClasses.TestCase):
 
         self.satisfiable = ast.literal_eval(test_dict['satisfiable']) if 'satisfiable' in test_dict else None
 
-        self.entailment = int(test_dict['entailment']) if 'entailment' in test_dict else None
+        # entailment/entails are a literal and a bool, or equally long lists of both
+        self.entailment = ast.literal_eval(test_dict['entailment']) if 'entailment' in test_dict else None
         self.entails = ast.literal_eval(test_dict['entails']) if 'entails' in test_dict else None
+        if isinstance(self.entailment, int):
+            self.entailment, self.entails = [self.entailment], [self.entails]
 
     def eval_code(self, module_dict):
         bindings = dict(module_dict)
@@ -86,11 +89,10 @@ class CNFTest(testClasses.TestCase):
     def execute(self, grades, module_dict, solution_dict):
         grades.addMessage('TEST: %s' % self.path)
         grades.addMessage('\t%s' % self.description)
-        depth = lambda L: isinstance(L, (list, tuple)) and (max(map(depth, L)) + 1 if len(L) > 0 else 0)
-        value = lambda L: all(map(value, L)) if isinstance(L, (list, tuple)) else isinstance(L, int)
-
         result = self.eval_code(module_dict)
-        if depth(result) != 2 or not value(result):
+        try:
+            cnf.check_cnf(result)
+        except ValueError:
             grades.addMessage('FAIL: %s' % self.path)
             grades.addMessage('\tknowledge base is not in valid CNF form')
             return False
@@ -133,14 +135,16 @@ class CNFTest(testClasses.TestCase):
                 return False
 
         if self.entailment is not None:
-            ent = cnf.entails(result, self.entailment)
-            if ent != self.entails:
-                grades.addMessage('FAIL: %s' % self.path)
-                if self.entails:
-                    grades.addMessage('\tknowledge base does not entail %s, but should' % self.entailment)
-                else:
-                    grades.addMessage('\tknowledge base entails %s, but should not' % self.entailment)
-                return False
+            answers = cnf.entails_many(result, self.entailment)
+            for literal, entails in zip(self.entailment, self.entails):
+                ent = answers[literal] == cnf.ENTAILED
+                if ent != entails:
+                    grades.addMessage('FAIL: %s' % self.path)
+                    if entails:
+                        grades.addMessage('\tknowledge base does not entail %s, but should' % literal)
+                    else:
+                        grades.addMessage('\tknowledge base entails %s, but should not' % literal)
+                    return False
 
 
         grades.addMessage('PASS: %s' % self.path)
@@ -0,0 +1,228 @@
+'''preprocess.py - CNF simplification before the solver is called.
+
+The clause sets built by cluedo.deal/suggest repeat themselves: the same
+negative unit facts come back turn after turn, axiom_card_unique binaries
+are already satisfied by those units, and subsumed clauses pile up.
+simplify() runs these steps in order and records what each one removed:
+
+  normalize   merge repeated literals, drop tautologies and duplicates
+  units       unit propagation
+  probe       failed literal probing
+  subsume     subsumption and self-subsuming resolution
+  eliminate   bounded variable elimination
+
+The result is equisatisfiable with the input.  Variable elimination
+leaves a reconstruction stack behind so that a model of the simplified
+clauses can be extended to a model of the original ones (extend_model).
+Variables passed as frozen are never eliminated, so queries about them
+can still be asked of the simplified clauses.
+'''
+
+import collections
+import time
+
+STEPS = ('normalize', 'units', 'probe', 'subsume', 'eliminate')
+
+class Preprocessor:
+
+    def __init__(self, kb, frozen=()):
+        self.clauses = set()
+        self.occurs = collections.defaultdict(set)
+        self.true = set()        # literals fixed at the top level
+        self.pending = []        # unit literals still to propagate
+        self.stack = []          # (var, clauses that contained var) for extend_model
+        self.frozen = set(abs(literal) for literal in frozen)
+        self.unsat = False
+        self.stats = []
+        self.input = [list(clause) for clause in kb]
+
+    # clause database
+
+    def size(self):
+        return len(self.clauses), sum(len(clause) for clause in self.clauses)
+
+    def add(self, literals):
+        clause = frozenset(literals)
+        if any(-literal in clause for literal in clause):
+            return
+        clause = frozenset(literal for literal in clause if -literal not in self.true)
+        if any(literal in self.true for literal in clause) or clause in self.clauses:
+            return
+        if not clause:
+            self.unsat = True
+            return
+        if len(clause) == 1:
+            self.pending.extend(clause)
+        self.clauses.add(clause)
+        for literal in clause:
+            self.occurs[literal].add(clause)
+
+    def remove(self, clause):
+        self.clauses.discard(clause)
+        for literal in clause:
+            self.occurs[literal].discard(clause)
+
+    def fix(self, literal):
+        "Make literal true at the top level and simplify the clauses with it"
+        if literal in self.true:
+            return
+        if -literal in self.true:
+            self.unsat = True
+            return
+        self.true.add(literal)
+        for clause in list(self.occurs[literal]):
+            self.remove(clause)
+        for clause in list(self.occurs[-literal]):
+            self.remove(clause)
+            self.add(clause - {-literal})
+
+    # steps
+
+    def normalize(self):
+        for clause in self.input:
+            self.add(clause)
+            if self.unsat:
+                return
+
+    def units(self):
+        while self.pending and not self.unsat:
+            self.fix(self.pending.pop())
+
+    def implied(self, literal):
+        "Literals unit propagation derives from literal, or None on a conflict"
+        assigned = set([literal])
+        queue = [literal]
+        while queue:
+            current = queue.pop()
+            for clause in self.occurs[-current]:
+                free = None
+                for other in clause:
+                    if other in assigned:
+                        break
+                    if -other not in assigned:
+                        if free is not None:
+                            break
+                        free = other
+                else:
+                    if free is None:
+                        return None
+                    assigned.add(free)
+                    queue.append(free)
+        return assigned
+
+    def probe(self, limit=1000):
+        variables = sorted(set(abs(literal) for clause in self.clauses for literal in clause))
+        for var in variables[:limit]:
+            if self.unsat:
+                return
+            if var in self.true or -var in self.true:
+                continue
+            positive = self.implied(var)
+            negative = self.implied(-var) if positive is not None else None
+            if positive is None:
+                self.pending.append(-var)
+            elif negative is None:
+                self.pending.append(var)
+            else:
+                # literals implied by both polarities hold outright
+                self.pending.extend(positive & negative)
+            self.units()
+
+    def subsume(self):
+        for clause in sorted(self.clauses, key=len):
+            if clause not in self.clauses:
+                continue
+            pivot = min(clause, key=lambda literal: len(self.occurs[literal]))
+            for other in list(self.occurs[pivot]):
+                if other is not clause and len(other) > len(clause) and clause <= other:
+                    self.remove(other)
+            for literal in clause:
+                rest = clause - {literal}
+                for other in list(self.occurs[-literal]):
+                    if len(other) >= len(clause) and rest <= other:
+                        # self-subsuming resolution: clause strengthens other
+                        self.remove(other)
+                        self.add(other - {-literal})
+            if self.unsat:
+                return
+        self.units()
+
+    def eliminate(self, max_occurs=10):
+        counts = collections.Counter(abs(literal) for clause in self.clauses for literal in clause)
+        for var, _ in sorted(counts.items(), key=lambda item: item[1]):
+            if self.unsat:
+                return
+            if var in self.frozen or var in self.true or -var in self.true:
+                continue
+            positive, negative = list(self.occurs[var]), list(self.occurs[-var])
+            if not positive and not negative:
+                continue
+            if len(positive) > max_occurs or len(negative) > max_occurs:
+                continue
+            resolvents = []
+            for p in positive:
+                for n in negative:
+                    resolvent = (p - {var}) | (n - {-var})
+                    if not any(-literal in resolvent for literal in resolvent):
+                        resolvents.append(resolvent)
+            if len(resolvents) > len(positive) + len(negative):
+                continue
+            self.stack.append((var, [tuple(clause) for clause in positive + negative]))
+            for clause in positive + negative:
+                self.remove(clause)
+            for resolvent in resolvents:
+                self.add(resolvent)
+            self.units()
+
+    def run(self, steps=STEPS):
+        for step in steps:
+            clauses, literals = self.size() if step != 'normalize' else (
+                len(self.input), sum(len(clause) for clause in self.input))
+            start = time.perf_counter()
+            getattr(self, step)()
+            after = self.size()
+            self.stats.append((step, clauses, after[0], literals, after[1], time.perf_counter() - start))
+            if self.unsat:
+                break
+        return self
+
+    # results
+
+    def kb(self):
+        """
+        The simplified clauses as a list of sorted lists.  Top level facts
+        about frozen variables are kept as unit clauses.
+        """
+        kb = [sorted(clause) for clause in self.clauses]
+        kb.extend([literal] for literal in self.true if abs(literal) in self.frozen)
+        return sorted(kb)
+
+    def extend_model(self, model):
+        """
+        Complete a model of kb() (a list of literals, possibly partial) to
+        a total model of the input
+        """
+        assignment = set(model) | self.true
+        eliminated = set(var for var, clauses in self.stack)
+        for clause in self.input:
+            for literal in clause:
+                var = abs(literal)
+                if var not in eliminated and var not in assignment and -var not in assignment:
+                    assignment.add(-var)
+        for var, clauses in reversed(self.stack):
+            assignment.discard(var)
+            assignment.discard(-var)
+            needed = any(var in clause and not any(literal in assignment for literal in clause if literal != var)
+                         for clause in clauses)
+            assignment.add(var if needed else -var)
+        return sorted(assignment, key=abs)
+
+    def report(self):
+        lines = ['%-10s %9s %9s %9s %9s %9s' % ('step', 'clauses', 'after', 'literals', 'after', 'ms')]
+        for step, clauses, clauses_after, literals, literals_after, seconds in self.stats:
+            lines.append('%-10s %9d %9d %9d %9d %9.2f' % (step, clauses, clauses_after, literals, literals_after, 1000 * seconds))
+        return '\n'.join(lines)
+
+def simplify(kb, frozen=(), steps=STEPS):
+    "Run the preprocessing steps on kb; returns the Preprocessor"
+    return Preprocessor(kb, frozen).run(steps)
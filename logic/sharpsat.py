@@ -0,0 +1,239 @@
+'''sharpsat.py - exact model counting (#SAT) in pure Python.
+
+ModelCounter.count is a DPLL search that counts instead of stopping at
+the first model:
+
+  - unit propagation after every decision
+  - variables that no clause mentions any more contribute a factor 2
+  - the remaining clauses are split into connected components (no shared
+    variables), which are counted separately and multiplied
+  - every component count is remembered in a cache keyed by the component
+    itself, so a sub-problem reached along different branches (or in a
+    later call on the same counter) is counted once; the cache is LRU
+    with a bounded size
+
+With project, a set of variables, the count is the number of distinct
+assignments to those variables that extend to a model.  Decisions are then
+made on projected variables first, and a component without any of them
+only needs a satisfiability check.
+
+ModelCounter.sample walks the same search and takes each branch with
+probability proportional to its count, which gives exactly uniform
+samples.  The counts come from the cache and the
+propagation after each branch is remembered as well, so once the first
+samples have been drawn the following ones mostly walk dictionaries.
+
+With deadline set (a time.perf_counter() value) a count that is still
+running then raises Timeout; what was cached so far stays valid.
+'''
+
+import collections
+import random
+import time
+
+class Timeout(Exception):
+    "A ModelCounter ran past its deadline"
+
+class ModelCounter:
+
+    def __init__(self, cache_size=100000):
+        self.cache = collections.OrderedDict()
+        self.splits = collections.OrderedDict()   # (component, literal) -> split() of that branch
+        self.cache_size = cache_size
+        self.project = None
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.decisions = 0
+        self.deadline = None
+
+    def count(self, kb, project=None, assumptions=()):
+        """
+        The number of models of kb (plus the assumption literals) over the
+        variables of kb, or over project if given
+        """
+        return self.count_clauses(*self.setup(kb, project, assumptions))
+
+    def sample(self, kb, project=None, rng=random):
+        """
+        A uniformly chosen model of kb as a list of literals ordered by
+        variable (restricted to project if given), or None if there is none
+        """
+        return next(self.samples(kb, project, rng), None)
+
+    def samples(self, kb, project=None, rng=random):
+        "Generate independent uniformly chosen models of kb (see sample) without end"
+        clauses, variables = self.setup(kb, project)
+        if self.count_clauses(clauses, variables) == 0:
+            return
+        top = split(clauses, variables)
+        project = self.project
+        while True:
+            model = set()
+            self.expand(top, model, rng)
+            yield sorted([literal for literal in model if abs(literal) in project], key=abs)
+
+    def setup(self, kb, project=None, assumptions=()):
+        "The clause set and variables to count for kb, with self.project set"
+        clauses = set()
+        for clause in kb:
+            clause = frozenset(clause)
+            if not any(-literal in clause for literal in clause):
+                clauses.add(clause)
+        variables = set(abs(literal) for clause in kb for literal in clause)
+        variables.update(abs(literal) for literal in assumptions)
+        if project is None:
+            project = variables
+        else:
+            project = set(abs(var) for var in project)
+            variables.update(project)
+        self.project = frozenset(project)
+        clauses.update(frozenset([literal]) for literal in assumptions)
+        return clauses, variables
+
+    def count_clauses(self, clauses, variables):
+        "Models of clauses over variables (a superset of the clause variables)"
+        reduced = propagate(clauses)
+        if reduced is None:
+            return 0
+        clauses, assigned = reduced
+        mentioned = set(abs(literal) for clause in clauses for literal in clause)
+        free = variables - mentioned - set(abs(literal) for literal in assigned)
+        result = 2 ** len(free & self.project)
+        for component in components(clauses):
+            result *= self.count_component(component)
+            if result == 0:
+                return 0
+        return result
+
+    def expand(self, parts, model, rng):
+        "Add to model a uniformly chosen completion of split() parts"
+        assigned, free, pieces = parts
+        model.update(assigned)
+        for var in free:
+            model.add(var if rng.random() < 0.5 else -var)
+        for component in pieces:
+            self.count_component(component)
+            result, var, positive, negative = self.cache[component, self.project]
+            literal = var if rng.random() * (positive + negative) < positive else -var
+            key = (component, literal)
+            if key not in self.splits:
+                variables = set(abs(literal) for clause in component for literal in clause)
+                self.splits[key] = split(component | {frozenset([literal])}, variables)
+                if len(self.splits) > self.cache_size:
+                    self.splits.popitem(last=False)
+            else:
+                self.splits.move_to_end(key)
+            self.expand(self.splits[key], model, rng)
+
+    def count_component(self, component):
+        "The count of component; the cache also keeps the branch taken and both branch counts"
+        key = (component, self.project)
+        if key in self.cache:
+            self.hits += 1
+            self.cache.move_to_end(key)
+            return self.cache[key][0]
+        self.misses += 1
+        if self.deadline is not None and time.perf_counter() > self.deadline:
+            raise Timeout()
+
+        occurs = collections.Counter(abs(literal) for clause in component for literal in clause)
+        variables = set(occurs)
+        projected = [var for var in occurs if var in self.project]
+        var = max(projected or occurs, key=lambda v: occurs[v])
+        self.decisions += 1
+        positive = self.count_clauses(component | {frozenset([var])}, variables)
+        if projected:
+            negative = self.count_clauses(component | {frozenset([-var])}, variables)
+        else:
+            # nothing to count here: the component only has to be satisfiable
+            negative = 0 if positive else min(1, self.count_clauses(component | {frozenset([-var])}, variables))
+            positive = min(1, positive)
+        result = positive + negative
+
+        self.cache[key] = (result, var, positive, negative)
+        if len(self.cache) > self.cache_size:
+            self.cache.popitem(last=False)
+            self.evictions += 1
+        return result
+
+    def stats(self):
+        return {'cache': len(self.cache), 'hits': self.hits, 'misses': self.misses,
+                'evictions': self.evictions, 'decisions': self.decisions}
+
+def propagate(clauses):
+    """
+    Unit propagation on a set of frozenset clauses.  Returns the clauses
+    that are not yet satisfied (with false literals removed) and the set
+    of assigned literals, or None on a conflict.
+    """
+    occurs = collections.defaultdict(list)
+    for clause in clauses:
+        for literal in clause:
+            occurs[literal].append(clause)
+    queue = [literal for clause in clauses if len(clause) == 1 for literal in clause]
+    if not queue:
+        return clauses, set()
+
+    assigned = set()
+    while queue:
+        literal = queue.pop()
+        if literal in assigned:
+            continue
+        if -literal in assigned:
+            return None
+        assigned.add(literal)
+        for clause in occurs[-literal]:
+            if any(other in assigned for other in clause):
+                continue
+            free = [other for other in clause if -other not in assigned]
+            if not free:
+                return None
+            if len(free) == 1:
+                queue.append(free[0])
+
+    reduced = set()
+    for clause in clauses:
+        if any(literal in assigned for literal in clause):
+            continue
+        reduced.add(frozenset(literal for literal in clause if -literal not in assigned))
+    return reduced, assigned
+
+def split(clauses, variables):
+    """
+    (assigned literals, free variables, components) for satisfiable
+    clauses over variables: what unit propagation assigns, the variables
+    it leaves unconstrained and the components of the rest
+    """
+    reduced, assigned = propagate(clauses)
+    mentioned = set(abs(literal) for clause in reduced for literal in clause)
+    free = variables - mentioned - set(abs(literal) for literal in assigned)
+    return assigned, sorted(free), components(reduced)
+
+def components(clauses):
+    "Split clauses into frozensets of clauses that share no variable"
+    parent = {}
+
+    def find(var):
+        while parent[var] != var:
+            parent[var] = parent[parent[var]]
+            var = parent[var]
+        return var
+
+    for clause in clauses:
+        variables = [abs(literal) for literal in clause]
+        for var in variables:
+            parent.setdefault(var, var)
+        root = find(variables[0])
+        for var in variables[1:]:
+            other = find(var)
+            if other != root:
+                parent[other] = root
+
+    groups = collections.defaultdict(list)
+    for clause in clauses:
+        groups[find(abs(next(iter(clause))))].append(clause)
+    return [frozenset(group) for group in groups.values()]
+
+def count(kb, project=None):
+    return ModelCounter().count(kb, project)
@@ -0,0 +1,204 @@
+'''walksat.py - stochastic local search for satisfiable knowledge bases.
+
+Local search starts from a random assignment and flips one variable at a
+time until no clause is false.  It cannot prove a knowledge base
+unsatisfiable, but when a model exists it usually finds one after a few
+hundred flips, well before a complete solver has finished.  Two ways of
+picking the variable to flip in a random false clause are offered:
+
+  probsat   ProbSAT: every variable with probability proportional to
+            (eps + break)^-cb
+  walksat   WalkSAT/SKC: a variable that breaks nothing if there is one,
+            otherwise a random one with probability noise, otherwise
+            one that breaks the fewest clauses
+
+The break count of a variable is the number of clauses it alone makes
+true, i.e. the clauses that flipping it would make false.  It is kept up
+to date on every flip rather than recomputed: each clause records how
+many of its literals are true and the sum of their variables, which is
+the variable itself whenever exactly one literal is true.  Clauses,
+occurrence lists and counters are flat arrays, as in cdcl.py, with the
+literal code 2*v for v and 2*v + 1 for -v.
+'''
+
+from array import array
+import itertools
+
+import util
+
+class Solver:
+
+    # ProbSAT's polynomial break function for 3-SAT (Balint and Schoening)
+    cb = 2.38
+    eps = 1.0
+    # WalkSAT/SKC random walk probability
+    noise = 0.567
+
+    def __init__(self, kb=(), rng=None, method='probsat'):
+        if method not in ('probsat', 'walksat'):
+            raise ValueError('unknown local search method %r' % method)
+        self.method = method
+        self.rng = rng or util.FixedRandom().random
+        self.stopped = None     # if set, called every 256 flips; true ends the search
+        self.flips = 0
+        self.empty = False      # kb has an empty clause, so no model exists
+
+        clauses = []
+        nvars = 0
+        for clause in kb:
+            if not clause:
+                self.empty = True
+                continue
+            top, bottom = max(clause), min(clause)
+            nvars = max(nvars, top, -bottom)
+            if bottom < 0 < top:
+                clause = set(clause)
+                if any(-literal in clause for literal in clause):
+                    continue
+            clauses.append(list(clause))
+        self.nvars = nvars
+        self.nclauses = len(clauses)
+
+        # clause c has the literals lits[start[c]:start[c + 1]]
+        self.lits = array('i', [literal for clause in clauses for literal in clause])
+        self.start = array('i', [0]) + array('i', itertools.accumulate(len(clause) for clause in clauses))
+
+        # the clauses containing literal code k are occurs[first[k]:first[k + 1]]
+        occurs = [[] for k in range(2 * self.nvars + 2)]
+        for c, clause in enumerate(clauses):
+            for literal in clause:
+                occurs[2 * literal if literal > 0 else -2 * literal + 1].append(c)
+        self.first = array('i', [0]) + array('i', itertools.accumulate(len(found) for found in occurs))
+        self.occurs = array('i', itertools.chain.from_iterable(occurs))
+
+        self.units = [clause[0] for clause in clauses if len(clause) == 1]
+        self.value = array('b', bytes(self.nvars + 1))
+        self.numtrue = self.truesum = self.breaks = self.where = None   # see randomize
+        self.false = []                                  # the false clauses ...
+        self.weights = [(self.eps + b) ** -self.cb for b in range(64)]
+
+    def randomize(self):
+        """
+        Start over from an assignment that satisfies the unit clauses and
+        gives every other variable the sign it has in more clauses, chosen
+        at random on a tie
+        """
+        nvars, nclauses = self.nvars, self.nclauses
+        occurs, first = self.occurs, self.first
+        bits = self.rng.getrandbits(nvars + 1)
+        value = self.value = array('b', bytes(nvars + 1))
+        for var in range(1, nvars + 1):
+            positive = first[2 * var + 1] - first[2 * var]
+            negative = first[2 * var + 2] - first[2 * var + 1]
+            value[var] = positive > negative or (positive == negative and (bits >> var) & 1)
+        for literal in self.units:
+            value[abs(literal)] = literal > 0
+
+        numtrue = self.numtrue = array('i', bytes(4 * nclauses))
+        truesum = self.truesum = array('i', bytes(4 * nclauses))
+        for var in range(1, nvars + 1):
+            k = 2 * var if value[var] else 2 * var + 1
+            for c in occurs[first[k]:first[k + 1]]:
+                numtrue[c] += 1
+                truesum[c] += var
+        breaks = self.breaks = array('i', bytes(4 * (nvars + 1)))
+        self.false = [c for c in range(nclauses) if numtrue[c] == 0]
+        self.where = array('i', [-1]) * nclauses
+        for position, c in enumerate(self.false):
+            self.where[c] = position
+        for c in range(nclauses):
+            if numtrue[c] == 1:
+                breaks[truesum[c]] += 1
+
+    def flip(self, var):
+        "Flip var, updating the true counts, break counts and false clauses"
+        occurs, first, numtrue, truesum, breaks = self.occurs, self.first, self.numtrue, self.truesum, self.breaks
+        false, where = self.false, self.where
+        self.value[var] ^= 1
+        if self.value[var]:
+            now_true, now_false = 2 * var, 2 * var + 1
+        else:
+            now_true, now_false = 2 * var + 1, 2 * var
+        self.flips += 1
+
+        for k in range(first[now_true], first[now_true + 1]):
+            c = occurs[k]
+            count = numtrue[c]
+            numtrue[c] = count + 1
+            truesum[c] += var
+            if count == 0:
+                # c is satisfied now: move the last false clause into its place
+                last = false.pop()
+                if last != c:
+                    false[where[c]] = last
+                    where[last] = where[c]
+                where[c] = -1
+                breaks[var] += 1
+            elif count == 1:
+                breaks[truesum[c] - var] -= 1
+
+        for k in range(first[now_false], first[now_false + 1]):
+            c = occurs[k]
+            count = numtrue[c] - 1
+            numtrue[c] = count
+            truesum[c] -= var
+            if count == 0:
+                where[c] = len(false)
+                false.append(c)
+                breaks[var] -= 1
+            elif count == 1:
+                breaks[truesum[c]] += 1
+
+    def pick(self, c):
+        "The variable to flip in the false clause c"
+        rng, breaks, lits = self.rng, self.breaks, self.lits
+        variables = [abs(lits[k]) for k in range(self.start[c], self.start[c + 1])]
+        if len(variables) == 1:
+            return variables[0]
+        if self.method == 'walksat':
+            fewest = min(breaks[var] for var in variables)
+            if fewest > 0 and rng.random() < self.noise:
+                return rng.choice(variables)
+            return rng.choice([var for var in variables if breaks[var] == fewest])
+        weights = self.weights
+        scores = [weights[breaks[var]] if breaks[var] < 64 else 0.0 for var in variables]
+        threshold = rng.random() * sum(scores)
+        for var, score in zip(variables, scores):
+            threshold -= score
+            if threshold <= 0:
+                return var
+        return variables[-1]
+
+    def solve(self, max_flips=100000):
+        """
+        Search for a model with at most max_flips flips.  Returns True
+        (model in self.model()), False if kb has an empty clause, or None
+        if the flips ran out or self.stopped asked the search to end.
+        """
+        if self.empty:
+            return False
+        self.randomize()
+        rng, stopped = self.rng, self.stopped
+        for flip in range(max_flips):
+            false = self.false
+            if not false:
+                return True
+            if stopped is not None and flip & 255 == 0 and stopped():
+                return None
+            self.flip(self.pick(false[int(rng.random() * len(false))]))
+        return True if not self.false else None
+
+    def model(self):
+        "The assignment found by the last successful solve, as DIMACS literals"
+        return [var if self.value[var] else -var for var in range(1, self.nvars + 1)]
+
+def satisfies(kb, model):
+    "Does the assignment model (a list of literals) make every clause of kb true?"
+    true = set(model)
+    return not any(map(true.isdisjoint, kb))
+
+def solve(kb, max_flips=100000, seed=None, method='probsat'):
+    "A model of kb found by local search, or None if none was found"
+    import random
+    solver = Solver(kb, random.Random(seed) if seed is not None else None, method)
+    return solver.model() if solver.solve(max_flips) else None
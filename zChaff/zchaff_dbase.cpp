@@ -350,7 +350,7 @@ bool CDatabase::enlarge_lit_pool(void) //will return true if successful, otherwi
     _lit_pool_end_storage = _lit_pool_start + new_size;
 
     //update all the pointers
-    int displacement = _lit_pool_start - old_start;
+    long displacement = _lit_pool_start - old_start;  // the blocks can be more than 2^31 apart
     for (i=0; i< clauses().size(); ++i)
 	if (clause(i).status()!=DELETED_CL) 
 	    clause(i).first_lit() += displacement; 
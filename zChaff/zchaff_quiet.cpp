@@ -0,0 +1,27 @@
+/*********************************************************************
+ zchaff_quiet.cpp - only linked into libsat.so.
+
+ The solver reports progress on cout and appends every refutation to
+ the resolve_trace file.  That is what the command line zchaff wants,
+ but a process that loads the library and solves thousands of small
+ instances (logic/libzchaff.py) needs both of them switched off.
+*********************************************************************/
+
+#include <iostream>
+#include <fstream>
+
+using namespace std;
+
+extern ofstream verify_out;
+
+extern "C" void SAT_SetQuiet(int quiet)
+{
+    if (quiet) {
+	cout.setstate(ios::failbit);
+	verify_out.setstate(ios::failbit);
+    }
+    else {
+	cout.clear();
+	verify_out.clear();
+    }
+}
@@ -129,6 +129,7 @@ CSolver::CSolver(void) {
     _implication_id		= 0;
     _num_marked			= 0;
     _num_in_new_cl		= 0;
+    _conflict_level0_gflag	= 0;
     _outside_constraint_hook	= NULL;
     _sat_hook	                = NULL;
 }
@@ -282,6 +283,21 @@ void CSolver::set_var_value(int v, int value, ClauseIdx ante, int dl)
     var.assgn_stack_pos() = _assignment_stack[dl]->size();
     _assignment_stack[dl]->push_back(v*2+!value);
 
+    if (dl == 0) {
+	//learned clauses leave out level 0 lits, so remember the clause
+	//groups this assignment rests on; see mark_vars_at_level
+	if (_level0_gflag.size() < variables().size())
+	    _level0_gflag.resize(variables().size());
+	unsigned gflag = 0;
+	if (ante != NULL_CLAUSE) {
+	    gflag = clause(ante).gflag();
+	    for (CLitPoolElement * itr = clause(ante).literals(); (*itr).val() > 0; ++ itr)
+		if ((*itr).var_index() != v)
+		    gflag |= _level0_gflag[(*itr).var_index()];
+	}
+	_level0_gflag[v] = gflag;
+    }
+
     if (dl == dlevel())
 	set_var_value_current_dl(v, value);
     else 
@@ -1355,6 +1371,8 @@ void CSolver::mark_vars_at_level(ClauseIdx cl, int var_idx, int dl)
 		    variable(v).set_new_cl_phase((*itr).var_sign());
 		    _conflict_lits.push_back((*itr).s_var());
                 }
+		else //dropped, but the learned clause still depends on its groups
+		    _conflict_level0_gflag |= _level0_gflag[v];
 	    }
 	    else //if this variable is already in the new clause, it must have the same phase 
 		assert(variable(v).new_cl_phase() == (*itr).var_sign());
@@ -1430,6 +1448,8 @@ int CSolver::finish_add_conf_clause(int gflag)
     
 {
     unsigned int i,sz;
+    gflag |= _conflict_level0_gflag;
+    _conflict_level0_gflag = 0;
     int back_dl = 0;
     int unit_lit = -1;
     ClauseIdx added_cl = add_conflict_clause(&(*_conflict_lits.begin()), _conflict_lits.size(), gflag);
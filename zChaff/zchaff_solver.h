@@ -281,6 +281,8 @@ protected:
     int 		_num_in_new_cl;		//used when constructing learned clauses
     vector<ClauseIdx> 	_conflicts;		//the conflicting clauses		       
     vector<int> 	_conflict_lits; 	//used when constructing learned clause
+    vector<unsigned> 	_level0_gflag;		//clause groups each level 0 assignment depends on
+    unsigned 		_conflict_level0_gflag;	//groups of the level 0 lits left out of a learned clause
     vector<int> 	_resolvents;
     multimap<int,int>   _shrinking_cls;
 protected: